@@ -1,54 +1,29 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import os, json, asyncio
-import googletrans
-
-from config import TOKEN
-from Func_SQL.funcSQL_utils import fetch_text_channel, check_text_channel
-from Func_SQL.funcSQL_categories import allocate_category, fetch_category_allocation, fetch_all_category_allocations
-
-# ───────────────────────────────────────────────────────────────
-# Répertoire de base pour la configuration des serveurs
-# ───────────────────────────────────────────────────────────────
-BASE_DIR = "Guilds"
-if not os.path.exists(BASE_DIR):
-    os.mkdir(BASE_DIR)
+import time, asyncio, contextlib
+
+from config import TOKEN, SHARD_COUNT, SHARD_IDS, METRICS_HOST, METRICS_PORT, DEV_GUILD_IDS, FORCE_COMMAND_SYNC
+from Func_Metrics.metrics import span, log_event
+from Func_Metrics.http_endpoint import start_metrics_server, stop_metrics_server
+from Func_SQL.db_pool import warm_up_pool, pool_metrics
+from Func_SQL.funcSQL_guilds import load_guild_config, add_game_guild, invalidate_guild_config, import_guild_configs_from_json
+from Func_SQL.funcSQL_categories import allocate_category, fetch_all_category_allocations, invalidate_category_allocations, preload_category_allocations
+from Func_SQL.funcSQL_migrations import run_migrations
+from Func_SQL.funcSQL_jobs import fetch_job, fetch_guild_jobs, JOB_PENDING, JOB_RUNNING, JOB_DONE, JOB_FAILED, JOB_CANCELLED
+from Func_Discord.api_executor import FollowupProgress, install_rate_limit_metrics
+from Func_Discord.guild_index import guild_index
+from Func_Discord.command_sync import sync_commands
+from Func_Discord.message_relay import message_relay
+from Func_Discord.webhook_registry import webhook_registry
+from Func_Discord.role_provisioning import provision_roles
+from Func_Discord.perm_snapshots import list_snapshots_async, matches_live_state, import_legacy_backups_async
+from Func_Discord.perm_jobs import job_manager, JobConflict, JOB_SYNC, JOB_ROLLBACK, JOB_LABELS
+from Func_Translation.language_index import language_index
 
 # ───────────────────────────────────────────────────────────────
 # Fonctions de gestion de la configuration serveur
 # ───────────────────────────────────────────────────────────────
-def get_server_folder(server_id: int) -> str:
-    folder = os.path.join(BASE_DIR, str(server_id))
-    if not os.path.exists(folder):
-        os.makedirs(folder)
-    return folder
-
-def get_server_config_path(server_id: int) -> str:
-    return os.path.join(get_server_folder(server_id), "config.json")
-
-def load_server_config(server_id: int) -> dict:
-    path = get_server_config_path(server_id)
-    if os.path.exists(path):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                config = json.load(f)
-        except Exception as e:
-            print(f"Erreur lors du chargement de la config pour le serveur {server_id} : {e}")
-            config = {}
-    else:
-        config = {}
-    if "guildes" not in config:
-        config["guildes"] = {}
-    if "languages" not in config:
-        config["languages"] = {}
-    return config
-
-def save_server_config(server_id: int, config: dict):
-    path = get_server_config_path(server_id)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(config, f, indent=4)
-
 def generate_prefix(name: str, existing_prefixes: list) -> str:
     words = name.split()
     initials = "".join([w[0].upper() for w in words if w])
@@ -65,48 +40,11 @@ def generate_prefix(name: str, existing_prefixes: list) -> str:
             return new_prefix
     return prefix + "0"
 
-# ───────────────────────────────────────────────────────────────
-# Fonctions de backup/rollback des permissions des salons
-# ───────────────────────────────────────────────────────────────
-def backup_channel_permissions(guild: discord.Guild) -> dict:
-    backup = {}
-    for channel in guild.channels:
-        overwrites_data = {}
-        for target, overwrite in channel.overwrites.items():
-            if isinstance(target, discord.Role):
-                target_type = "role"
-            elif isinstance(target, discord.Member):
-                target_type = "member"
-            else:
-                target_type = "unknown"
-            overwrites_data[str(target.id)] = {
-                "target_type": target_type,
-                "permissions": overwrite._values  # Note: _values est interne, à utiliser avec précaution.
-            }
-        backup[str(channel.id)] = overwrites_data
-    return backup
-
-def save_backup(server_id: int, backup_data: dict):
-    path = os.path.join(get_server_folder(server_id), "permissions_backup.json")
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(backup_data, f, indent=4)
-
-def load_backup(server_id: int) -> dict:
-    path = os.path.join(get_server_folder(server_id), "permissions_backup.json")
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return None
-
 # ───────────────────────────────────────────────────────────────
 # Autocomplétion pour les langues via googletrans
 # ───────────────────────────────────────────────────────────────
 async def language_autocomplete(interaction: discord.Interaction, current: str):
-    choices = []
-    for code, name in googletrans.LANGUAGES.items():
-        if current.lower() in code.lower() or current.lower() in name.lower():
-            choices.append(app_commands.Choice(name=f"{name.title()} ({code.upper()})", value=code.upper()))
-    return choices[:25]
+    return language_index.lookup(current)
 
 # ───────────────────────────────────────────────────────────────
 # Autocomplétion pour le nom de catégorie et la guilde de jeu
@@ -122,7 +60,7 @@ async def cat_name_autocomplete(interaction: discord.Interaction, current: str):
 
 async def guilde_autocomplete(interaction: discord.Interaction, current: str):
     choices = []
-    config = load_server_config(interaction.guild_id)
+    config = await load_guild_config(interaction.guild_id, readonly=True)
     game_guilds = config.get("guildes", {})
     for gg_id, gg in game_guilds.items():
         base_prefix = gg.get("base_prefix", "")
@@ -140,24 +78,118 @@ intents.members = True
 intents.message_content = True
 intents.guilds = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+class TikanaBot(commands.AutoShardedBot):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.started_at = time.perf_counter()
+        self.startup_timings = {}  # phase -> durée en secondes
+        self.setup_done_at = None
+        self.ready_once = False
+        self._startup_task = None
+
+    @contextlib.contextmanager
+    def startup_phase(self, phase: str):
+        start = time.perf_counter()
+        try:
+            with span("startup", phase):
+                yield
+        finally:
+            self.startup_timings[phase] = time.perf_counter() - start
+
+    async def _warm_up_database(self):
+        # Préchauffage du pool BDD, migrations du schéma et import des anciens config.json
+        # (idempotent) avant la première commande
+        with self.startup_phase("database"):
+            try:
+                await warm_up_pool()
+                applied = await run_migrations()
+                await import_guild_configs_from_json()
+            except Exception as e:
+                print(f"Erreur lors du préchauffage du pool BDD : {e}")
+                return
+        if applied:
+            print(f"Migrations appliquées : {', '.join(f'{m.version} ({m.name})' for m in applied)}")
+
+    async def _sync_commands(self):
+        # Les commandes sont globales : un seul processus (celui du shard 0) les synchronise,
+        # et seulement si l'arbre a changé depuis la dernière synchronisation
+        if SHARD_IDS is not None and 0 not in SHARD_IDS:
+            return
+        with self.startup_phase("command_sync"):
+            try:
+                synced = await sync_commands(self, DEV_GUILD_IDS, FORCE_COMMAND_SYNC)
+            except discord.HTTPException as e:
+                print(f"Erreur lors de la synchronisation des commandes : {e}")
+                return
+        if synced:
+            print(f"Commandes synchronisées : {', '.join(synced)}")
+
+    async def setup_hook(self):
+        self.startup_timings["login"] = time.perf_counter() - self.started_at
+        await asyncio.gather(self._warm_up_database(), self._sync_commands())
+        # Endpoint /metrics local (désactivé si metrics_port n'est pas défini)
+        if METRICS_PORT:
+            try:
+                await start_metrics_server(METRICS_HOST, METRICS_PORT)
+            except OSError as e:
+                print(f"Impossible de démarrer l'endpoint de métriques sur le port {METRICS_PORT} : {e}")
+        self.setup_done_at = time.perf_counter()
+
+    async def finish_startup(self):
+        """
+        Appelé au premier on_ready : préchauffe les caches des serveurs, reprend les jobs
+        interrompus puis affiche la durée de chaque phase du démarrage.
+        """
+        with self.startup_phase("cache_warmup"):
+            for guild in self.guilds:
+                guild_index.get(guild)
+            try:
+                await preload_category_allocations([guild.id for guild in self.guilds])
+            except Exception as e:
+                print(f"Erreur lors du préchargement des allocations : {e}")
+            imported = await import_legacy_backups_async([guild.id for guild in self.guilds])
+        if imported:
+            print(f"{imported} ancien(s) backup(s) de permissions importé(s).")
+        with self.startup_phase("job_resume"):
+            resumed = await job_manager.resume_all()
+        if resumed:
+            print(f"{resumed} job(s) repris.")
+        total = time.perf_counter() - self.started_at
+        print("Démarrage : " + " | ".join(f"{phase} {elapsed:.2f}s" for phase, elapsed in self.startup_timings.items()) + f" | total {total:.2f}s")
+        log_event("startup.done", guilds=len(self.guilds), total_s=f"{total:.3f}",
+                  **{f"{phase}_s": f"{elapsed:.3f}" for phase, elapsed in self.startup_timings.items()})
+
+    async def close(self):
+        # Les jobs interrompus restent running en base et sont repris au redémarrage
+        await job_manager.shutdown()
+        await stop_metrics_server()
+        await webhook_registry.close()
+        await super().close()
+
+# Sans shard_count / shard_ids, discord.py choisit le nombre de shards recommandé
+# et ce processus les gère tous ; launcher.py répartit les shards sur plusieurs processus.
+bot = TikanaBot(command_prefix="!", intents=intents, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS)
+install_rate_limit_metrics()
+job_manager.attach(bot)
+webhook_registry.attach(bot)
 
 # ───────────────────────────────────────────────────────────────
 # Commande /guild_add
 # ───────────────────────────────────────────────────────────────
 @bot.tree.command(name="guild_add", description="Ajouter une nouvelle guilde de jeu (max 10 par serveur)")
 async def guild_add(interaction: discord.Interaction, name: str):
+    await interaction.response.defer(ephemeral=True)
     server_id = interaction.guild_id
     guild = interaction.channel.guild
-    config = load_server_config(server_id)
+    config = await load_guild_config(server_id)
     guildes = config.get("guildes", {})
 
     if len(guildes) >= 10:
-        await interaction.response.send_message("⚠️ Nombre maximum de guildes de jeu atteint (10).", ephemeral=True)
+        await interaction.followup.send("⚠️ Nombre maximum de guildes de jeu atteint (10).", ephemeral=True)
         return
 
     if not guild.me.guild_permissions.manage_roles:
-        await interaction.response.send_message(
+        await interaction.followup.send(
             "❌ Je n'ai pas la permission de **créer des rôles**.\n"
             "👉 Vérifiez que j'ai la permission `Gérer les rôles` et que mon rôle est placé au-dessus des rôles à créer.\n"
             "⚙️ Pour régler cela, allez dans Paramètres du serveur > Rôles et déplacez mon rôle vers le haut.",
@@ -173,22 +205,18 @@ async def guild_add(interaction: discord.Interaction, name: str):
     while new_id in existing_ids:
         new_id += 1
 
-    guild_config = {"id": new_id, "name": name, "base_prefix": base_prefix}
-    config["guildes"][str(new_id)] = guild_config
-    save_server_config(server_id, config)
+    try:
+        await add_game_guild(server_id, new_id, name, base_prefix)
+    except Exception as e:
+        await interaction.followup.send(f"❌ Erreur lors de l'ajout de la guilde de jeu : {e}", ephemeral=True)
+        return
+    config["guildes"][str(new_id)] = {"id": new_id, "name": name, "base_prefix": base_prefix}
 
     # Création automatique des rôles pour chaque langue déjà définie globalement
-    for lang_code in config.get("languages", {}):
-        full_prefix = f"{base_prefix}_{lang_code}"
-        role_name = f"Role_{full_prefix}"
-        existing_role = discord.utils.get(guild.roles, name=role_name)
-        if existing_role is None:
-            try:
-                await guild.create_role(name=role_name)
-            except Exception as e:
-                print(f"Erreur lors de la création du rôle {role_name} : {e}")
+    with span("guild_add", "roles", guild=server_id, base_prefix=base_prefix):
+        await provision_roles(guild, config, base_prefixes=[base_prefix], on_progress=FollowupProgress(interaction, "Création des rôles"))
 
-    await interaction.response.send_message(
+    await interaction.followup.send(
         f"✅ Guilde de jeu ajoutée avec ID **{new_id}** et préfixe de base **{base_prefix}**.",
         ephemeral=True
     )
@@ -199,7 +227,7 @@ async def guild_add(interaction: discord.Interaction, name: str):
 @bot.tree.command(name="config_show", description="Afficher la configuration actuelle du serveur")
 async def config_show(interaction: discord.Interaction):
     server_id = interaction.guild_id
-    config = load_server_config(server_id)
+    config = await load_guild_config(server_id, readonly=True)
     game_guilds = config.get("guildes", {})
     global_languages = config.get("languages", {})
 
@@ -243,16 +271,12 @@ async def cat_allocate(interaction: discord.Interaction, cat_id: str, guilde: st
     guild_obj = interaction.guild
     guild_id = guild_obj.id
 
-    category = None
-    for cat in guild_obj.categories:
-        if str(cat.id) == cat_id:
-            category = cat
-            break
+    category = guild_index.category_by_id(guild_obj, int(cat_id)) if cat_id.isdigit() else None
     if category is None:
         await interaction.response.send_message(f"❌ Catégorie d'ID {cat_id} introuvable.", ephemeral=True)
         return
 
-    config = load_server_config(guild_id)
+    config = await load_guild_config(guild_id, readonly=True)
     game_guilds = config.get("guildes", {})
     allocated_game_guild_id = None
     allocated_game_guild = None
@@ -267,6 +291,8 @@ async def cat_allocate(interaction: discord.Interaction, cat_id: str, guilde: st
 
     try:
         await allocate_category(category.id, guild_id, category.name, allocated_game_guild_id, allocated_game_guild.get("base_prefix", ""))
+        # Pendant un job du serveur, le plan en cours est invalidé : la catégorie est recalculée à sa fin
+        job_manager.mark_category(category)
         await interaction.response.send_message(
             f"✅ La catégorie **{category.name}** a été allouée à la guilde de jeu **{allocated_game_guild.get('name', guilde)}**.",
             ephemeral=True
@@ -281,7 +307,7 @@ async def cat_allocate(interaction: discord.Interaction, cat_id: str, guilde: st
 async def guild_list(interaction: discord.Interaction):
     server_id = interaction.guild_id
     guild = interaction.channel.guild
-    config = load_server_config(server_id)
+    config = await load_guild_config(server_id, readonly=True)
     guildes = config.get("guildes", {})
 
     if not guildes:
@@ -304,7 +330,7 @@ async def guild_list(interaction: discord.Interaction):
 @bot.tree.command(name="server_list_languages", description="Afficher les langues configurées pour le serveur")
 async def server_list_languages(interaction: discord.Interaction):
     server_id = interaction.guild_id
-    config = load_server_config(server_id)
+    config = await load_guild_config(server_id, readonly=True)
     languages = config.get("languages", {})
     if not languages:
         await interaction.response.send_message("ℹ️ Aucune langue n'est configurée pour ce serveur.", ephemeral=True)
@@ -314,218 +340,228 @@ async def server_list_languages(interaction: discord.Interaction):
         message += f"• **{name} ({code})**\n"
     await interaction.response.send_message(message, ephemeral=True)
 
+# ───────────────────────────────────────────────────────────────
+# Commande /roles_provision
+# ───────────────────────────────────────────────────────────────
+@bot.tree.command(name="roles_provision", description="Créer les rôles manquants pour chaque guilde de jeu et chaque langue")
+async def roles_provision(interaction: discord.Interaction):
+    guild = interaction.guild
+    if guild is None:
+        await interaction.response.send_message("⚠️ Cette commande ne peut être utilisée que dans un serveur.", ephemeral=True)
+        return
+    if not guild.me.guild_permissions.manage_roles:
+        await interaction.response.send_message("❌ Je n'ai pas la permission de **créer des rôles**.", ephemeral=True)
+        return
+    await interaction.response.defer(ephemeral=True)
+    config = await load_guild_config(guild.id, readonly=True)
+    summary = await provision_roles(guild, config, on_progress=FollowupProgress(interaction, "Création des rôles"))
+    message = (
+        f"✅ Rôles : **{len(summary['created'])}** créés, **{summary['existing']}** déjà présents, "
+        f"**{len(summary['failed'])}** en échec."
+    )
+    if summary["failed"]:
+        message += "\n• ❌ " + ", ".join(summary["failed"][:20])
+    await interaction.followup.send(message, ephemeral=True)
+
 # ───────────────────────────────────────────────────────────────
 # Commande /sync_channels
 # ───────────────────────────────────────────────────────────────
+def job_conflict_message(job: dict) -> str:
+    label = JOB_LABELS.get(job["kind"], job["kind"])
+    return (
+        f"⚠️ {label} (job #{job['job_id']}) déjà en cours sur ce serveur : "
+        f"attendez sa fin (/job_status) ou annulez-le avec /job_cancel."
+    )
+
 @bot.tree.command(name="sync_channels", description="Synchroniser les permissions en se basant sur la DB, les allocations et la config langues")
 async def sync_channels(interaction: discord.Interaction):
     await interaction.response.defer(ephemeral=True)
-    server_id = interaction.guild_id
-    guild_obj = interaction.channel.guild
-    config = load_server_config(server_id)
-    game_guilds = config.get("guildes", {})
-    global_languages = config.get("languages", {})
-
-    # Étape 0 : Backup des permissions
-    backup_data = backup_channel_permissions(guild_obj)
-    save_backup(server_id, backup_data)
-    print("Backup effectué :", backup_data)
-
-    # Étape 1 : Mise à jour des langues depuis la DB
-    for channel in guild_obj.channels:
-        exists = await check_text_channel(channel.id)
-        if exists:
-            ch_data = await fetch_text_channel(channel.id)
-            short_lang = ch_data[7]  # Index à vérifier selon votre DB
-            if short_lang:
-                lang_code = short_lang.upper()
-                if lang_code not in global_languages:
-                    lang_full = googletrans.LANGUAGES.get(lang_code.lower(), lang_code).title()
-                    global_languages[lang_code] = lang_full
-    config["languages"] = global_languages
-    save_server_config(server_id, config)
-
-    # Étape 2 : Construction du mapping des rôles pour chaque guilde
-    roles_dict = {}
-    for g_config in game_guilds.values():
-        base_prefix = g_config.get("base_prefix")
-        lang_roles = {}
-        for lang_code in global_languages:
-            full_prefix = f"{base_prefix}_{lang_code}"
-            role_name = f"Role_{full_prefix}"
-            role = discord.utils.get(guild_obj.roles, name=role_name)
-            if role:
-                lang_roles[lang_code] = role
-            else:
-                print(f"Rôle non trouvé : {role_name}")
-        roles_dict[base_prefix] = lang_roles
-
-    restored_count = 0
-
-    # Étape 3 : Application de la configuration sur chaque salon/catégorie
-    for channel in guild_obj.channels:
-        channel_name = channel.name.lower()
-        # Cas des catégories
-        if isinstance(channel, discord.CategoryChannel):
-            has_prefix = any(channel_name.startswith(bp.lower()) or channel_name.endswith(bp.lower()) for bp in roles_dict)
-            if not has_prefix:
-                allocation = await fetch_category_allocation(channel.id, guild_obj.id)
-                if allocation:
-                    allocated_game_guild = allocation[1]
-                    lang_roles = roles_dict.get(allocated_game_guild, {})
-                else:
-                    lang_roles = {}
-            else:
-                for bp in roles_dict:
-                    if channel_name.startswith(bp.lower()) or channel_name.endswith(bp.lower()):
-                        lang_roles = roles_dict[bp]
-                        break
-            try:
-                await channel.set_permissions(guild_obj.default_role, overwrite=discord.PermissionOverwrite(view_channel=False))
-                for role in lang_roles.values():
-                    await channel.set_permissions(role, overwrite=discord.PermissionOverwrite(view_channel=True))
-                if channel.overwrites:
-                    for target, overw in channel.overwrites.items():
-                        if isinstance(target, discord.Role) and target not in lang_roles.values() and target != guild_obj.default_role:
-                            new_overwrite = overw
-                            new_overwrite.view_channel = None
-                            await channel.set_permissions(target, overwrite=new_overwrite)
-                restored_count += 1
-                print(f"Catégorie {channel.name} configurée.")
-            except Exception as e:
-                print(f"Erreur configuration catégorie {channel.name}: {e}")
-        # Cas des salons classiques
-        else:
-            exists = await check_text_channel(channel.id)
-            if exists:
-                ch_data = await fetch_text_channel(channel.id)
-                short_lang = ch_data[7]
-                if short_lang:
-                    short_lang = short_lang.upper()
-                    applied = False
-                    for base_prefix, lang_roles in roles_dict.items():
-                        bp_lower = base_prefix.lower()
-                        short_lang_lower = short_lang.lower()
-                        full_prefix = f"{bp_lower}_{short_lang_lower}"
-                        if channel_name.startswith(full_prefix) or channel_name.endswith(full_prefix):
-                            try:
-                                await channel.set_permissions(guild_obj.default_role, overwrite=discord.PermissionOverwrite(view_channel=False))
-                                for lang_code, role in lang_roles.items():
-                                    if lang_code.upper() == short_lang:
-                                        await channel.set_permissions(role, overwrite=discord.PermissionOverwrite(view_channel=True))
-                                    else:
-                                        await channel.set_permissions(role, overwrite=discord.PermissionOverwrite(view_channel=False))
-                                if channel.overwrites:
-                                    for target, overw in channel.overwrites.items():
-                                        if isinstance(target, discord.Role) and target not in lang_roles.values() and target != guild_obj.default_role:
-                                            new_overwrite = overw
-                                            new_overwrite.view_channel = None
-                                            await channel.set_permissions(target, overwrite=new_overwrite)
-                                restored_count += 1
-                                applied = True
-                                print(f"Channel {channel.name} configuré avec préfixe complet pour langue {short_lang}.")
-                            except Exception as e:
-                                print(f"Erreur configuration channel {channel.name} (préfixe complet): {e}")
-                            break
-                    if not applied and channel.category is not None:
-                        allocation = await fetch_category_allocation(channel.category.id, guild_obj.id)
-                        if allocation:
-                            allocated_game_guild = allocation[1]
-                            lang_roles = roles_dict.get(allocated_game_guild, {})
-                            try:
-                                await channel.set_permissions(guild_obj.default_role, overwrite=discord.PermissionOverwrite(view_channel=False))
-                                for lang_code, role in lang_roles.items():
-                                    if lang_code.upper() == short_lang:
-                                        await channel.set_permissions(role, overwrite=discord.PermissionOverwrite(view_channel=True))
-                                    else:
-                                        await channel.set_permissions(role, overwrite=discord.PermissionOverwrite(view_channel=False))
-                                if channel.overwrites:
-                                    for target, overw in channel.overwrites.items():
-                                        if isinstance(target, discord.Role) and target not in lang_roles.values() and target != guild_obj.default_role:
-                                            new_overwrite = overw
-                                            new_overwrite.view_channel = None
-                                            await channel.set_permissions(target, overwrite=new_overwrite)
-                                restored_count += 1
-                                applied = True
-                                print(f"Channel {channel.name} configuré via catégorie allouée pour langue {short_lang}.")
-                            except Exception as e:
-                                print(f"Erreur configuration channel {channel.name} via catégorie allouée: {e}")
-                    if not applied:
-                        # Déterminer la guilde de jeu qui possède la langue configurée
-                        matching_guild = None
-                        for base_prefix, lang_roles in roles_dict.items():
-                            # Si cette guilde possède un rôle pour la langue du salon
-                            if short_lang in lang_roles:
-                                matching_guild = base_prefix
-                                break
-                        if matching_guild:
-                            try:
-                                await channel.set_permissions(guild_obj.default_role,
-                                                            overwrite=discord.PermissionOverwrite(view_channel=False))
-                                for lang_code, role in roles_dict[matching_guild].items():
-                                    if lang_code.upper() == short_lang:
-                                        await channel.set_permissions(role, overwrite=discord.PermissionOverwrite(view_channel=True))
-                                    else:
-                                        await channel.set_permissions(role, overwrite=discord.PermissionOverwrite(view_channel=False))
-                                if channel.overwrites:
-                                    for target, overw in channel.overwrites.items():
-                                        if (isinstance(target, discord.Role) and 
-                                            target not in roles_dict[matching_guild].values() and 
-                                            target != guild_obj.default_role):
-                                            new_overwrite = overw
-                                            new_overwrite.view_channel = None
-                                            await channel.set_permissions(target, overwrite=new_overwrite)
-                                restored_count += 1
-                                print(f"Channel {channel.name} fallback général configuré pour langue {short_lang} (matching guild: {matching_guild}).")
-                            except Exception as e:
-                                print(f"Erreur fallback général pour channel {channel.name}: {e}")
-                        else:
-                            print(f"Aucune guilde trouvée pour la langue {short_lang} dans le fallback du channel {channel.name}.")
-            else:
-                print(f"Channel {channel.name} non configuré en DB, ignoré.")
-
-    await interaction.followup.send(f"✅ Permissions synchronisées pour **{restored_count}** salons.", ephemeral=True)
+    # Le snapshot, la création des rôles et l'application des permissions sont faits
+    # par un job en arrière-plan, repris après le dernier salon traité en cas de redémarrage
+    try:
+        job_id, created = await job_manager.submit(JOB_SYNC, interaction.guild, interaction=interaction)
+    except JobConflict as e:
+        await interaction.followup.send(job_conflict_message(e.job), ephemeral=True)
+        return
+    if not created:
+        await interaction.followup.send(
+            f"🔗 Une synchronisation est déjà en cours sur ce serveur (job #{job_id}) : son résultat vous sera envoyé ici.",
+            ephemeral=True
+        )
+        return
+    await interaction.followup.send(
+        f"🚀 Synchronisation lancée (job #{job_id}). Suivi avec /job_status, annulation avec /job_cancel.",
+        ephemeral=True
+    )
 
 # ───────────────────────────────────────────────────────────────
 # Commande /rollback
 # ───────────────────────────────────────────────────────────────
-@bot.tree.command(name="rollback", description="Restaurer l'état des permissions des salons depuis le dernier backup")
-async def rollback(interaction: discord.Interaction):
+async def snapshot_version_autocomplete(interaction: discord.Interaction, current: int):
+    choices = []
+    for entry in reversed(await list_snapshots_async(interaction.guild_id)):
+        version = entry["version"]
+        if not current or str(current) in str(version):
+            choices.append(app_commands.Choice(name=f"v{version} — {entry['created_at']} ({entry['channels']} salons)", value=version))
+    return choices[:25]
+
+@bot.tree.command(name="rollback", description="Restaurer l'état des permissions des salons depuis un backup")
+@app_commands.autocomplete(version=snapshot_version_autocomplete)
+@app_commands.describe(version="Version du backup à restaurer (la plus récente par défaut)")
+async def rollback(interaction: discord.Interaction, version: int = None):
     await interaction.response.defer(ephemeral=True)
-    server_id = interaction.guild_id
-    guild = interaction.channel.guild
-    backup_data = load_backup(server_id)
-    if not backup_data:
+    snapshots = await list_snapshots_async(interaction.guild_id)
+    if not snapshots:
         await interaction.followup.send("ℹ️ Aucun backup n'a été trouvé.", ephemeral=True)
         return
-    restored_channels = 0
-    for channel in guild.channels:
-        ch_backup = backup_data.get(str(channel.id), {})
-        new_overwrites = {}
-        for target_id, data in ch_backup.items():
-            target_type = data.get("target_type")
-            perms = data.get("permissions", {})
-            if target_type == "role":
-                target = guild.get_role(int(target_id))
-            elif target_type == "member":
-                target = guild.get_member(int(target_id))
-            else:
-                target = None
-            if target:
-                new_overwrites[target] = discord.PermissionOverwrite(**perms)
-        try:
-            await channel.edit(overwrites=new_overwrites)
-            restored_channels += 1
-        except Exception as e:
-            print(f"Erreur lors de la restauration des permissions pour le salon {channel.name}: {e}")
-    await interaction.followup.send(f"✅ **{restored_channels}** salons restaurés avec succès.", ephemeral=True)
+    if version is not None and version not in {entry["version"] for entry in snapshots}:
+        await interaction.followup.send(f"❌ Le backup v{version} n'existe pas.", ephemeral=True)
+        return
+    if matches_live_state(snapshots, interaction.guild, version):
+        target = f"v{version}" if version is not None else f"v{snapshots[-1]['version']}"
+        await interaction.followup.send(f"✅ Les permissions correspondent déjà au backup {target} : rien à restaurer.", ephemeral=True)
+        return
+    # Seuls les salons dont les overwrites diffèrent du backup sont modifiés (job en arrière-plan)
+    try:
+        job_id, _ = await job_manager.submit(JOB_ROLLBACK, interaction.guild, {"version": version}, interaction)
+    except JobConflict as e:
+        await interaction.followup.send(job_conflict_message(e.job), ephemeral=True)
+        return
+    await interaction.followup.send(
+        f"🚀 Rollback lancé (job #{job_id}). Suivi avec /job_status, annulation avec /job_cancel.",
+        ephemeral=True
+    )
+
+# ───────────────────────────────────────────────────────────────
+# Commandes /job_status et /job_cancel
+# ───────────────────────────────────────────────────────────────
+JOB_STATUS_ICONS = {
+    JOB_PENDING: "⏸️",
+    JOB_RUNNING: "⏳",
+    JOB_DONE: "✅",
+    JOB_FAILED: "❌",
+    JOB_CANCELLED: "🛑",
+}
+
+@bot.tree.command(name="job_status", description="Afficher les derniers jobs de synchronisation / rollback du serveur")
+async def job_status(interaction: discord.Interaction):
+    jobs = await fetch_guild_jobs(interaction.guild_id)
+    if not jobs:
+        await interaction.response.send_message("ℹ️ Aucun job n'a été lancé sur ce serveur.", ephemeral=True)
+        return
+    message = "**📋 Derniers jobs**\n"
+    for job in jobs:
+        icon = JOB_STATUS_ICONS.get(job["status"], "•")
+        message += (
+            f"{icon} **#{job['job_id']}** {job['kind']} ({job['status']}) : "
+            f"{job['done']}/{job['total']} salons, {job['changed']} modifiés, {job['failed']} en échec"
+            f" — {job['created_at']}\n"
+        )
+        if job["error"]:
+            message += f"  ↳ {job['error'][:200]}\n"
+    await interaction.response.send_message(message, ephemeral=True)
+
+@bot.tree.command(name="job_cancel", description="Annuler un job de synchronisation / rollback en cours")
+@app_commands.describe(job_id="Identifiant du job (voir /job_status)")
+async def job_cancel(interaction: discord.Interaction, job_id: int):
+    job = await fetch_job(job_id)
+    if job is None or job["guild_id"] != interaction.guild_id:
+        await interaction.response.send_message(f"❌ Le job #{job_id} n'existe pas sur ce serveur.", ephemeral=True)
+        return
+    if not await job_manager.cancel(job_id):
+        await interaction.response.send_message(f"ℹ️ Le job #{job_id} est déjà terminé ({job['status']}).", ephemeral=True)
+        return
+    await interaction.response.send_message(f"🛑 Annulation du job #{job_id} demandée.", ephemeral=True)
+
+# ───────────────────────────────────────────────────────────────
+# Index des rôles / catégories et synchronisation incrémentale sur événements
+# ───────────────────────────────────────────────────────────────
+@bot.event
+async def on_guild_available(guild: discord.Guild):
+    # Serveur de nouveau disponible (reconnexion, fin de panne) : les objets Discord ont pu être remplacés
+    guild_index.drop(guild.id)
+
+@bot.event
+async def on_guild_remove(guild: discord.Guild):
+    # Les caches sont locaux au processus : on libère ceux du serveur quitté
+    guild_index.drop(guild.id)
+    invalidate_guild_config(guild.id)
+    invalidate_category_allocations(guild.id)
+
+@bot.event
+async def on_guild_channel_create(channel: discord.abc.GuildChannel):
+    guild_index.on_channel_create(channel)
+    job_manager.mark_channel(channel)
+
+@bot.event
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+    guild_index.on_channel_delete(channel)
+    message_relay.groups.invalidate_channel(channel.id)
+    webhook_registry.evict_channel(channel.id)
+
+@bot.event
+async def on_webhooks_update(channel: discord.abc.GuildChannel):
+    # Webhook créé, modifié ou supprimé : il sera résolu à nouveau au prochain envoi
+    webhook_registry.evict_channel(channel.id)
+
+@bot.event
+async def on_guild_channel_update(before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+    guild_index.on_channel_update(before, after)
+    # Seuls un renommage ou un déplacement de catégorie changent la règle applicable
+    # (les modifications d'overwrites, y compris les nôtres, sont ignorées)
+    if before.name != after.name or getattr(before, "category_id", None) != getattr(after, "category_id", None):
+        job_manager.mark_channel(after)
+
+@bot.event
+async def on_guild_role_create(role: discord.Role):
+    guild_index.on_role_create(role)
+    job_manager.mark_role(role)
+
+@bot.event
+async def on_guild_role_delete(role: discord.Role):
+    guild_index.on_role_delete(role)
+
+@bot.event
+async def on_guild_role_update(before: discord.Role, after: discord.Role):
+    guild_index.on_role_update(before, after)
+    if before.name != after.name:
+        job_manager.mark_role(after)
+
+# ───────────────────────────────────────────────────────────────
+# Relais traduit des messages entre les salons d'un même groupe
+# ───────────────────────────────────────────────────────────────
+@bot.listen("on_message")
+async def relay_message(message: discord.Message):
+    # listen() plutôt qu'un on_message : le traitement des commandes préfixées est conservé
+    try:
+        await message_relay.handle_message(message)
+    except Exception as e:
+        print(f"Erreur lors du relais du message {message.id} : {e}")
+
+# ───────────────────────────────────────────────────────────────
+# Commande /db_status
+# ───────────────────────────────────────────────────────────────
+@bot.tree.command(name="db_status", description="Afficher l'état du pool de connexions à la base de données")
+async def db_status(interaction: discord.Interaction):
+    metrics = pool_metrics()
+    message = "**🗄 Pool BDD**\n"
+    message += f"• Connexions : **{metrics['in_use']}** utilisées / **{metrics['idle']}** libres (min {metrics['minsize']}, max {metrics['maxsize']})\n"
+    message += f"• Acquisitions : **{metrics['acquires']}** | Délais dépassés : **{metrics['acquire_timeouts']}**\n"
+    message += f"• Attente moyenne : **{metrics['wait_time_avg'] * 1000:.1f} ms** | max : **{metrics['wait_time_max'] * 1000:.1f} ms**\n"
+    await interaction.response.send_message(message, ephemeral=True)
 
 # ───────────────────────────────────────────────────────────────
 # Démarrage du bot
 # ───────────────────────────────────────────────────────────────
 @bot.event
 async def on_ready():
-    await bot.tree.sync()
     print(f"Connecté en tant que {bot.user}.")
+    # on_ready est rappelé après chaque reconnexion : la fin du démarrage n'est faite qu'une fois
+    if bot.ready_once:
+        return
+    bot.ready_once = True
+    bot.startup_timings["gateway"] = time.perf_counter() - (bot.setup_done_at or bot.started_at)
+    bot._startup_task = asyncio.create_task(bot.finish_startup())
 
-bot.run(TOKEN)
+# root_logger=True : les logs structurés (metrics, db_pool, api_executor...) passent par le handler de discord.py
+bot.run(TOKEN, root_logger=True)
@@ -0,0 +1,42 @@
+# Func_Config/persistence.py
+
+import os
+import json
+import tempfile
+
+# ───────────────────────────────────────────────────────────────
+# Persistance des fichiers de configuration
+# ───────────────────────────────────────────────────────────────
+# - écriture atomique : fichier temporaire dans le même dossier, fsync puis
+#   os.replace (un crash en cours d'écriture laisse l'ancien fichier intact) ;
+# - les appelants asynchrones les exécutent hors de la boucle asyncio
+#   (asyncio.to_thread).
+# ───────────────────────────────────────────────────────────────
+
+def atomic_write_bytes(path: str, data: bytes):
+    folder = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".tmp_", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def atomic_write_json(path: str, data, indent: int = 4):
+    atomic_write_bytes(path, json.dumps(data, indent=indent).encode("utf-8"))
+
+def read_json(path: str, default=None):
+    """
+    Lecture synchrone d'un fichier JSON ; retourne default si le fichier n'existe pas.
+    """
+    if not os.path.exists(path):
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,46 @@
+# Func_Config/server_config.py
+
+import os
+
+from Func_Config.persistence import read_json
+
+# ───────────────────────────────────────────────────────────────
+# Répertoire de base pour la configuration des serveurs
+# ───────────────────────────────────────────────────────────────
+# Les configs sont désormais en base (GameGuilds / ServerLanguages) : les
+# config.json ne sont plus écrits, seulement lus par l'import de
+# Func_SQL/funcSQL_guilds.py au démarrage. Les dossiers des serveurs
+# accueillent aussi les snapshots de permissions.
+# ───────────────────────────────────────────────────────────────
+BASE_DIR = "Guilds"
+if not os.path.exists(BASE_DIR):
+    os.mkdir(BASE_DIR)
+
+_known_folders = set()
+
+def get_server_folder(server_id: int, create: bool = True) -> str:
+    """
+    Dossier du serveur ; avec create=False (lectures), le chemin est retourné sans rien créer.
+    """
+    folder = os.path.join(BASE_DIR, str(server_id))
+    if create and folder not in _known_folders:
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        _known_folders.add(folder)
+    return folder
+
+def get_server_config_path(server_id: int) -> str:
+    return os.path.join(get_server_folder(server_id, create=False), "config.json")
+
+def load_server_config(server_id: int) -> dict:
+    """
+    Lit le config.json d'un serveur ({"guildes": {}, "languages": {}} s'il est absent ou illisible).
+    """
+    try:
+        config = read_json(get_server_config_path(server_id), default={})
+    except Exception as e:
+        print(f"Erreur lors du chargement de la config pour le serveur {server_id} : {e}")
+        config = {}
+    config.setdefault("guildes", {})
+    config.setdefault("languages", {})
+    return config
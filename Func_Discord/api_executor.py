@@ -0,0 +1,292 @@
+# Func_Discord/api_executor.py
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+
+import discord
+
+from Func_Metrics.metrics import registry
+
+logger = logging.getLogger("api_executor")
+
+# ───────────────────────────────────────────────────────────────
+# Exécuteur partagé pour les écritures Discord (permissions, rôles)
+# ───────────────────────────────────────────────────────────────
+# - concurrence bornée (sémaphore global à tous les jobs) ;
+# - un "bucket" par route Discord : après un 429, tous les appels de la
+#   route (ou de toutes les routes si le 429 est global) sont mis en pause ;
+# - retry avec backoff exponentiel sur 429 / 5xx ;
+# - callback de progression après chaque job.
+#
+# Ces buckets sont une seconde couche : le HTTPClient de discord.py attend et
+# rejoue lui-même les 429 (quelle que soit leur durée) et les 500/502/504 ;
+# seules remontent ici les erreurs après épuisement de ses essais. Les 429 qu'il
+# absorbe sont lus dans son journal (install_rate_limit_metrics) : comptés, et
+# reportés sur le bucket de la route pour que les jobs suivants attendent
+# sans occuper une place du sémaphore.
+# ───────────────────────────────────────────────────────────────
+
+DEFAULT_CONCURRENCY = 5
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 30.0
+
+# Métriques par type de route ("channel", "guild_roles", ...) pour garder peu de séries
+API_CALLS = registry.counter("tikana_discord_api_calls_total", "Appels d'écriture à l'API Discord par résultat", ("route", "outcome"))
+API_RATE_LIMITED = registry.counter("tikana_discord_api_rate_limited_total", "Réponses 429 reçues", ("route", "scope"))
+API_RETRIES = registry.counter("tikana_discord_api_retries_total", "Nouveaux essais programmés", ("route", "reason"))
+API_SECONDS = registry.histogram("tikana_discord_api_call_duration_seconds", "Durée d'un appel d'écriture à l'API Discord", ("route",))
+API_LIBRARY_RATE_LIMITED = registry.counter(
+    "tikana_discord_library_rate_limited_total", "429 attendus puis rejoués par discord.py (toutes requêtes)", ("route", "scope")
+)
+
+def channel_route(channel) -> tuple:
+    """Bucket des écritures sur un salon (overwrites, edit)."""
+    return ("channel", channel.id)
+
+def guild_roles_route(guild) -> tuple:
+    """Bucket de création/modification des rôles d'un serveur."""
+    return ("guild_roles", guild.id)
+
+def _url_parts(url: str) -> list:
+    parts = [part for part in str(url).split("/api/", 1)[-1].split("/") if part]
+    if len(parts) >= 2 and parts[0].startswith("v") and parts[0][1:].isdigit():
+        parts = parts[1:]
+    return parts
+
+def _route_from_url(url: str) -> str:
+    """
+    Type de route (mêmes libellés que les métriques de l'exécuteur) d'une URL de l'API Discord.
+    """
+    parts = _url_parts(url)
+    if parts[:1] == ["channels"]:
+        return "channel"
+    if parts[:1] == ["guilds"] and parts[2:3] == ["roles"]:
+        return "guild_roles"
+    if parts[:1] in (["webhooks"], ["interactions"]):
+        return parts[0]
+    return "other"
+
+def _executor_route(method: str, url: str) -> tuple:
+    """
+    Bucket de l'exécuteur correspondant à une requête (None si elle ne passe pas par lui).
+    """
+    parts = _url_parts(url)
+    if method == "PATCH" and len(parts) == 2 and parts[0] == "channels" and parts[1].isdigit():
+        return ("channel", int(parts[1]))
+    if method == "POST" and len(parts) == 3 and parts[0] == "guilds" and parts[2] == "roles" and parts[1].isdigit():
+        return ("guild_roles", int(parts[1]))
+    return None
+
+class _RateLimitLogHandler(logging.Handler):
+    """
+    Suit les 429 que discord.py attend et rejoue sans lever d'exception (journal discord.http).
+    """
+    def emit(self, record: logging.LogRecord):
+        message = str(record.msg)
+        if message.startswith("We are being rate limited") and "erroring instead" not in message:
+            method, url, retry_after = record.args
+            API_LIBRARY_RATE_LIMITED.inc(route=_route_from_url(url), scope="route")
+            route = _executor_route(method, url)
+            if route is not None:
+                executor.pause(route, retry_after)
+        elif message.startswith("Global rate limit has been hit"):
+            API_LIBRARY_RATE_LIMITED.inc(route="all", scope="global")
+            executor.pause(None, record.args[0])
+
+def install_rate_limit_metrics():
+    """
+    Branche le comptage des 429 absorbés par discord.py (idempotent).
+    """
+    http_logger = logging.getLogger("discord.http")
+    if not any(isinstance(handler, _RateLimitLogHandler) for handler in http_logger.handlers):
+        http_logger.addHandler(_RateLimitLogHandler(logging.WARNING))
+
+@dataclass
+class WriteJob:
+    route: tuple
+    factory: object  # callable sans argument retournant un awaitable
+    label: str = ""
+    # False pour une création (POST) : après un 5xx ou un timeout la requête a pu
+    # aboutir côté Discord, seul un 429 (refus explicite) est alors rejoué
+    idempotent: bool = True
+
+@dataclass
+class JobResult:
+    label: str
+    ok: bool
+    result: object = None
+    error: Exception = None
+    attempts: int = 0
+
+@dataclass
+class _Bucket:
+    blocked_until: float = 0.0
+
+def _retry_after(error: Exception) -> float:
+    """
+    Extrait le délai d'attente d'un 429 (attribut retry_after ou en-tête Retry-After).
+    """
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is not None:
+        return float(retry_after)
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("X-RateLimit-Reset-After")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _is_global(error: Exception) -> bool:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    return str(headers.get("X-RateLimit-Global", "")).lower() == "true"
+
+class DiscordWriteExecutor:
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, max_retries: int = DEFAULT_MAX_RETRIES,
+                 base_delay: float = DEFAULT_BASE_DELAY, max_delay: float = DEFAULT_MAX_DELAY):
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._semaphore = None
+        self._buckets = {}
+        self._global_blocked_until = 0.0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Créé paresseusement pour être lié à la boucle asyncio du bot
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    def _get_bucket(self, route: tuple) -> _Bucket:
+        bucket = self._buckets.get(route)
+        if bucket is None:
+            bucket = self._buckets[route] = _Bucket()
+        return bucket
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def pause(self, route: tuple, delay: float):
+        """
+        Bloque une route (toutes si route est None) pendant delay secondes.
+        """
+        deadline = time.monotonic() + delay
+        if route is None:
+            self._global_blocked_until = max(self._global_blocked_until, deadline)
+        else:
+            bucket = self._get_bucket(route)
+            bucket.blocked_until = max(bucket.blocked_until, deadline)
+
+    async def _wait_until(self, deadline: float):
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _run_job(self, job: WriteJob) -> JobResult:
+        bucket = self._get_bucket(job.route)
+        route = job.route[0]
+        attempt = 0
+        while True:
+            attempt += 1
+            await self._wait_until(max(bucket.blocked_until, self._global_blocked_until))
+            try:
+                async with self._get_semaphore():
+                    start = time.perf_counter()
+                    try:
+                        result = await job.factory()
+                    finally:
+                        API_SECONDS.observe(time.perf_counter() - start, route=route)
+                API_CALLS.inc(route=route, outcome="ok")
+                return JobResult(label=job.label, ok=True, result=result, attempts=attempt)
+            except (discord.HTTPException, discord.RateLimited) as e:
+                status = getattr(e, "status", 429 if isinstance(e, discord.RateLimited) else None)
+                API_CALLS.inc(route=route, outcome=str(status or "error"))
+                if status == 429:
+                    API_RATE_LIMITED.inc(route=route, scope="global" if _is_global(e) else "route")
+                retryable = status == 429 or (job.idempotent and status is not None and status >= 500)
+                if attempt > self.max_retries or not retryable:
+                    return JobResult(label=job.label, ok=False, error=e, attempts=attempt)
+                if status == 429:
+                    delay = _retry_after(e) or self._backoff(attempt)
+                    deadline = time.monotonic() + delay
+                    if _is_global(e):
+                        self._global_blocked_until = max(self._global_blocked_until, deadline)
+                    bucket.blocked_until = max(bucket.blocked_until, deadline)
+                    API_RETRIES.inc(route=route, reason="rate_limited")
+                    logger.warning(f"429 sur {job.route} ({job.label}), nouvel essai dans {delay:.2f}s")
+                else:
+                    delay = self._backoff(attempt)
+                    bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + delay)
+                    API_RETRIES.inc(route=route, reason="server_error")
+                    logger.warning(f"Erreur {status} sur {job.route} ({job.label}), nouvel essai dans {delay:.2f}s")
+            except asyncio.TimeoutError as e:
+                API_CALLS.inc(route=route, outcome="timeout")
+                if attempt > self.max_retries or not job.idempotent:
+                    return JobResult(label=job.label, ok=False, error=e, attempts=attempt)
+                API_RETRIES.inc(route=route, reason="timeout")
+                bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + self._backoff(attempt))
+            except Exception as e:
+                API_CALLS.inc(route=route, outcome="error")
+                return JobResult(label=job.label, ok=False, error=e, attempts=attempt)
+
+    async def run(self, jobs: list, on_progress=None) -> list:
+        """
+        Exécute les jobs et retourne la liste des JobResult dans l'ordre des jobs.
+        on_progress est une coroutine optionnelle (done, total, result) appelée après chaque job.
+        """
+        total = len(jobs)
+        done = 0
+
+        async def runner(job: WriteJob) -> JobResult:
+            nonlocal done
+            result = await self._run_job(job)
+            done += 1
+            if on_progress is not None:
+                try:
+                    await on_progress(done, total, result)
+                except Exception as e:
+                    logger.error(f"Erreur dans le callback de progression : {e}")
+            return result
+
+        return list(await asyncio.gather(*(runner(job) for job in jobs)))
+
+# Exécuteur partagé par toutes les commandes
+executor = DiscordWriteExecutor()
+
+# ───────────────────────────────────────────────────────────────
+# Progression via le message de suivi d'une interaction
+# ───────────────────────────────────────────────────────────────
+class FollowupProgress:
+    """
+    Met à jour périodiquement un message de suivi éphémère (au plus une fois par intervalle).
+    """
+    def __init__(self, interaction: discord.Interaction, title: str, interval: float = 3.0):
+        self.interaction = interaction
+        self.title = title
+        self.interval = interval
+        self.message = None
+        self.failed = 0
+        self._last_update = 0.0
+
+    async def __call__(self, done: int, total: int, result: JobResult):
+        if not result.ok:
+            self.failed += 1
+        now = time.monotonic()
+        if done < total and now - self._last_update < self.interval:
+            return
+        self._last_update = now
+        content = f"⏳ {self.title} : **{done}/{total}** ({self.failed} en échec)"
+        try:
+            if self.message is None:
+                self.message = await self.interaction.followup.send(content, ephemeral=True, wait=True)
+            else:
+                await self.message.edit(content=content)
+        except discord.HTTPException as e:
+            logger.warning(f"Impossible de mettre à jour la progression : {e}")
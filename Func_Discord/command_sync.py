@@ -0,0 +1,71 @@
+# Func_Discord/command_sync.py
+
+import os
+import json
+import asyncio
+import hashlib
+import logging
+
+import discord
+from discord import app_commands
+
+from Func_Config.persistence import atomic_write_json, read_json
+
+logger = logging.getLogger("command_sync")
+
+# ───────────────────────────────────────────────────────────────
+# Synchronisation de l'arbre de commandes conditionnée par son empreinte
+# ───────────────────────────────────────────────────────────────
+# tree.sync() est lent et fortement limité par Discord alors que les commandes
+# changent rarement. On calcule une empreinte du payload envoyé à Discord
+# (Command.to_dict) et on ne synchronise que si elle diffère de la dernière
+# synchronisation réussie, enregistrée par application et par portée
+# ("global" ou id du serveur de développement).
+# ───────────────────────────────────────────────────────────────
+STATE_FILE = os.path.join("Conf_files", "command_sync.json")
+
+def tree_payload(tree: app_commands.CommandTree, guild: discord.abc.Snowflake = None) -> list:
+    commands = tree.get_commands(guild=guild)
+    return sorted((command.to_dict(tree) for command in commands), key=lambda payload: (payload.get("type", 1), payload["name"]))
+
+def tree_hash(tree: app_commands.CommandTree, guild: discord.abc.Snowflake = None) -> str:
+    payload = json.dumps(tree_payload(tree, guild), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _scope_key(application_id: int, guild: discord.abc.Snowflake = None) -> str:
+    return f"{application_id}:{guild.id if guild is not None else 'global'}"
+
+async def sync_if_changed(bot: discord.Client, guild: discord.abc.Snowflake = None, force: bool = False) -> bool:
+    """
+    Synchronise l'arbre (global, ou d'un serveur) si son empreinte a changé. Retourne True si un sync a eu lieu.
+    """
+    key = _scope_key(bot.application_id, guild)
+    digest = tree_hash(bot.tree, guild)
+    state = await asyncio.to_thread(read_json, STATE_FILE, {})
+    if not force and state.get(key) == digest:
+        logger.info(f"Commandes inchangées ({key}), pas de synchronisation")
+        return False
+    await bot.tree.sync(guild=guild)
+    # Relecture : un autre processus a pu écrire entre-temps
+    state = await asyncio.to_thread(read_json, STATE_FILE, {})
+    state[key] = digest
+    await asyncio.to_thread(atomic_write_json, STATE_FILE, state)
+    logger.info(f"Commandes synchronisées ({key})")
+    return True
+
+async def sync_commands(bot: discord.Client, dev_guild_ids: list = None, force: bool = False) -> list:
+    """
+    En développement (dev_guild_ids), les commandes globales sont copiées et synchronisées sur ces
+    serveurs seulement (mise à jour immédiate) ; sinon l'arbre global est synchronisé.
+    Retourne la liste des portées synchronisées.
+    """
+    synced = []
+    if dev_guild_ids:
+        for guild_id in dev_guild_ids:
+            guild = discord.Object(id=guild_id)
+            bot.tree.copy_global_to(guild=guild)
+            if await sync_if_changed(bot, guild, force):
+                synced.append(str(guild_id))
+    elif await sync_if_changed(bot, None, force):
+        synced.append("global")
+    return synced
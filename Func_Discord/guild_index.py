@@ -0,0 +1,99 @@
+# Func_Discord/guild_index.py
+
+import discord
+
+# ───────────────────────────────────────────────────────────────
+# Index par serveur : nom de rôle -> rôle, id de catégorie -> catégorie
+# ───────────────────────────────────────────────────────────────
+# Construit une fois par serveur au premier accès, puis tenu à jour par les
+# événements de création / modification / suppression de rôles et de salons.
+# En cas de noms de rôles en double, le premier rôle de guild.roles est retenu,
+# comme avec discord.utils.get(guild.roles, name=...).
+# Après une reconnexion complète (nouvel IDENTIFY), discord.py remplace ses
+# objets Guild / Role / CategoryChannel : un index construit sur un autre
+# objet Guild est reconstruit au prochain accès.
+# ───────────────────────────────────────────────────────────────
+
+class GuildIndex:
+    def __init__(self, guild: discord.Guild):
+        self.guild = guild
+        self.roles_by_name = {}
+        self.categories_by_id = {}
+        for role in guild.roles:
+            self.roles_by_name.setdefault(role.name, role)
+        for category in guild.categories:
+            self.categories_by_id[category.id] = category
+
+    def _reindex_role_name(self, guild: discord.Guild, name: str):
+        role = discord.utils.get(guild.roles, name=name)
+        if role is None:
+            self.roles_by_name.pop(name, None)
+        else:
+            self.roles_by_name[name] = role
+
+class GuildIndexRegistry:
+    def __init__(self):
+        self._indexes = {}
+
+    def get(self, guild: discord.Guild) -> GuildIndex:
+        index = self._indexes.get(guild.id)
+        if index is None or index.guild is not guild:
+            index = self._indexes[guild.id] = GuildIndex(guild)
+        return index
+
+    def role_by_name(self, guild: discord.Guild, name: str):
+        return self.get(guild).roles_by_name.get(name)
+
+    def category_by_id(self, guild: discord.Guild, category_id: int):
+        return self.get(guild).categories_by_id.get(category_id)
+
+    def drop(self, guild_id: int):
+        self._indexes.pop(guild_id, None)
+
+    def _current(self, guild: discord.Guild):
+        # Index périmé (autre objet Guild) : reconstruit au prochain accès plutôt que mis à jour
+        index = self._indexes.get(guild.id)
+        return index if index is not None and index.guild is guild else None
+
+    # ───────────────────────────────────────────────────────────
+    # Mise à jour depuis les événements (index non construit = rien à faire)
+    # ───────────────────────────────────────────────────────────
+    def on_role_created(self, role: discord.Role):
+        """
+        Rôle retourné par guild.create_role : discord.py ne l'ajoute à guild.roles qu'à
+        l'événement GUILD_ROLE_CREATE, il est donc indexé directement (sans relire guild.roles).
+        """
+        self.get(role.guild).roles_by_name.setdefault(role.name, role)
+
+    def on_role_create(self, role: discord.Role):
+        index = self._current(role.guild)
+        if index is not None:
+            index._reindex_role_name(role.guild, role.name)
+
+    def on_role_update(self, before: discord.Role, after: discord.Role):
+        index = self._current(after.guild)
+        if index is not None and before.name != after.name:
+            index._reindex_role_name(after.guild, before.name)
+            index._reindex_role_name(after.guild, after.name)
+
+    def on_role_delete(self, role: discord.Role):
+        index = self._current(role.guild)
+        current = index.roles_by_name.get(role.name) if index is not None else None
+        if current is not None and current.id == role.id:
+            index._reindex_role_name(role.guild, role.name)
+
+    def on_channel_create(self, channel):
+        index = self._current(channel.guild)
+        if index is not None and isinstance(channel, discord.CategoryChannel):
+            index.categories_by_id[channel.id] = channel
+
+    def on_channel_update(self, before, after):
+        self.on_channel_create(after)
+
+    def on_channel_delete(self, channel):
+        index = self._current(channel.guild)
+        if index is not None:
+            index.categories_by_id.pop(channel.id, None)
+
+# Registre partagé, alimenté par les événements du bot
+guild_index = GuildIndexRegistry()
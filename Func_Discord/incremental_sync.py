@@ -0,0 +1,162 @@
+# Func_Discord/incremental_sync.py
+
+import asyncio
+import logging
+import re
+
+import discord
+
+from Func_SQL.funcSQL_guilds import load_guild_config, add_languages
+from Func_SQL.funcSQL_utils import fetch_text_channels_map
+from Func_SQL.funcSQL_categories import fetch_category_allocation
+from Func_Discord.perm_planner import (
+    plan_channel, resolve_channel_rule, build_roles_dict, discover_languages, apply_plans, RoutingRules
+)
+
+logger = logging.getLogger("incremental_sync")
+
+# ───────────────────────────────────────────────────────────────
+# Synchronisation incrémentale des permissions
+# ───────────────────────────────────────────────────────────────
+# Les événements Discord (création / renommage / déplacement de salon,
+# création / renommage de rôle) et les allocations de catégories marquent
+# des salons "à recalculer". Après un court délai (regroupement des rafales),
+# seuls ces salons sont replanifiés avec les mêmes règles que /sync_channels,
+# et seules les différences sont appliquées.
+# ───────────────────────────────────────────────────────────────
+DEFAULT_DEBOUNCE = 2.0
+
+ROLE_NAME_RE = re.compile(r"^Role_(?P<base_prefix>.+)_(?P<lang>[^_]+)$")
+
+def affected_channel_ids(channel) -> set:
+    """
+    Salons à recalculer pour un salon modifié : lui-même et, pour une catégorie, ses salons enfants.
+    """
+    channel_ids = {channel.id}
+    if isinstance(channel, discord.CategoryChannel):
+        channel_ids.update(child.id for child in channel.channels)
+    return channel_ids
+
+def parse_role_name(name: str):
+    """
+    Retourne (base_prefix, lang_code) pour un nom de rôle Role_<prefix>_<lang>, sinon None.
+    """
+    match = ROLE_NAME_RE.match(name or "")
+    if match is None:
+        return None
+    return match.group("base_prefix"), match.group("lang").upper()
+
+class IncrementalSync:
+    def __init__(self, debounce: float = DEFAULT_DEBOUNCE):
+        self.debounce = debounce
+        self._pending = {}  # guild_id -> set(channel_id)
+        self._roles = {}    # guild_id -> set((base_prefix, lang_code))
+        self._tasks = {}    # guild_id -> asyncio.Task
+        self._guilds = {}   # guild_id -> discord.Guild
+
+    # ───────────────────────────────────────────────────────────
+    # Marquage des salons affectés
+    # ───────────────────────────────────────────────────────────
+    def mark_channels(self, guild: discord.Guild, channel_ids):
+        self._pending.setdefault(guild.id, set()).update(channel_ids)
+        self._schedule(guild)
+
+    def mark_channel(self, channel):
+        """
+        Un salon créé, renommé ou déplacé. Pour une catégorie, ses salons enfants sont aussi recalculés.
+        """
+        self.mark_channels(channel.guild, affected_channel_ids(channel))
+
+    def mark_category(self, category: discord.CategoryChannel):
+        """Une catégorie (ré)allouée à une guilde de jeu."""
+        self.mark_channel(category)
+
+    def mark_role(self, role: discord.Role):
+        """
+        Un rôle Role_<prefix>_<lang> créé ou renommé : les salons concernés sont résolus au moment du recalcul.
+        """
+        parsed = parse_role_name(role.name)
+        if parsed is None:
+            return
+        self._roles.setdefault(role.guild.id, set()).add(parsed)
+        self._schedule(role.guild)
+
+    def _schedule(self, guild: discord.Guild):
+        self._guilds[guild.id] = guild
+        task = self._tasks.get(guild.id)
+        if task is None or task.done():
+            self._tasks[guild.id] = asyncio.create_task(self._run_later(guild.id))
+
+    async def _run_later(self, guild_id: int):
+        # Boucle tant que des événements arrivent pendant le recalcul précédent
+        while guild_id in self._pending or guild_id in self._roles:
+            await asyncio.sleep(self.debounce)
+            guild = self._guilds.get(guild_id)
+            channel_ids = self._pending.pop(guild_id, set())
+            role_keys = self._roles.pop(guild_id, set())
+            if guild is None:
+                continue
+            try:
+                summary = await self.sync(guild, channel_ids, role_keys)
+                logger.info(f"Sync incrémentale {guild_id} : {summary['changed']} modifiés, "
+                            f"{summary['unchanged']} inchangés, {summary['failed']} en échec")
+            except Exception as e:
+                logger.error(f"Erreur de sync incrémentale pour le serveur {guild_id} : {e}")
+        self._tasks.pop(guild_id, None)
+        self._guilds.pop(guild_id, None)
+
+    # ───────────────────────────────────────────────────────────
+    # Recalcul
+    # ───────────────────────────────────────────────────────────
+    async def _channels_for_roles(self, guild: discord.Guild, role_keys: set, rules: RoutingRules,
+                                  text_channels: dict, get_allocation) -> set:
+        """
+        Salons routés vers une guilde de jeu dont un rôle Role_<prefix>_<lang> a changé,
+        résolus avec les mêmes règles que /sync_channels (préfixe, allocation, fallback).
+        """
+        affected = [rules.roles_dict[base_prefix] for base_prefix in {base_prefix for base_prefix, _ in role_keys}
+                    if base_prefix in rules.roles_dict]
+        channel_ids = set()
+        for channel in guild.channels:
+            rule = await resolve_channel_rule(channel, rules, text_channels, get_allocation)
+            if rule is not None and any(rule[0] is lang_roles for lang_roles in affected):
+                channel_ids.add(channel.id)
+        return channel_ids
+
+    async def sync(self, guild: discord.Guild, channel_ids: set, role_keys: set = None) -> dict:
+        """
+        Replanifie et applique les permissions des seuls salons indiqués.
+        """
+        channels = [channel for channel in (guild.get_channel(cid) for cid in channel_ids) if channel is not None]
+        if not channels and not role_keys:
+            return {"changed": 0, "unchanged": 0, "failed": 0, "ambiguous": 0, "results": []}
+
+        config = await load_guild_config(guild.id)
+        if role_keys:
+            # Les salons concernés par un rôle ne sont connus qu'après résolution de tout le serveur
+            text_channels = await fetch_text_channels_map(guild_id=guild.id)
+        else:
+            text_channels = await fetch_text_channels_map(channel_ids=[channel.id for channel in channels])
+        discovered = discover_languages(text_channels, config["languages"])
+        if discovered:
+            await add_languages(guild.id, discovered)
+            config["languages"].update(discovered)
+        rules = RoutingRules(build_roles_dict(guild, config, report_missing=False))
+
+        async def get_allocation(category_id: int):
+            return await fetch_category_allocation(category_id, guild.id)
+
+        if role_keys:
+            role_channel_ids = await self._channels_for_roles(guild, role_keys, rules, text_channels, get_allocation)
+            known = {channel.id for channel in channels}
+            channels += [guild.get_channel(cid) for cid in role_channel_ids - known]
+
+        plans = []
+        for channel in channels:
+            plan = await plan_channel(channel, guild, rules, text_channels, get_allocation)
+            if plan is not None:
+                plans.append(plan)
+        return await apply_plans(plans)
+
+# Instance partagée, alimentée par les événements du bot
+incremental_sync = IncrementalSync()
@@ -0,0 +1,174 @@
+# Func_Discord/message_relay.py
+
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import discord
+
+from Func_Metrics.metrics import registry
+from Func_SQL.funcSQL_utils import fetch_text_channel_group
+from Func_Translation.translator import translator
+from Func_Discord.webhook_registry import webhook_registry, WebhookUnavailable
+
+logger = logging.getLogger("message_relay")
+
+# ───────────────────────────────────────────────────────────────
+# Relais des messages entre les salons d'un même groupe (TCgroup_id)
+# ───────────────────────────────────────────────────────────────
+# Un message posté dans un salon d'un groupe est traduit vers la langue de
+# chaque autre salon du groupe puis reposté via le webhook de ce salon
+# (Webhook_id, résolu une fois par le registre des webhooks), avec le nom et
+# l'avatar de l'auteur. Les messages envoyés par
+# des webhooks ou des bots sont ignorés, ce qui évite les boucles.
+# Les groupes sont mis en cache par salon (y compris "aucun groupe", cas de la
+# plupart des messages) pendant GROUP_CACHE_TTL : la table TextChannel est
+# alimentée en dehors du bot.
+# ───────────────────────────────────────────────────────────────
+GROUP_CACHE_TTL = 300.0
+GROUP_CACHE_MAX_SIZE = 50000
+MAX_MESSAGE_LENGTH = 2000
+MAX_USERNAME_LENGTH = 80
+
+RELAYED_MESSAGES = registry.counter("tikana_relay_messages_total", "Messages relayés vers au moins un salon")
+RELAY_DELIVERIES = registry.counter("tikana_relay_deliveries_total", "Envois via webhook par résultat", ("result",))
+RELAY_SECONDS = registry.histogram("tikana_relay_duration_seconds", "Durée du relais d'un message (traduction + envois)")
+
+@dataclass(frozen=True)
+class GroupMember:
+    channel_id: int
+    guild_id: int
+    webhook_id: int
+    short_language: str
+
+@dataclass(frozen=True)
+class ChannelGroup:
+    group_id: int
+    members: tuple
+
+    def member(self, channel_id: int):
+        for member in self.members:
+            if member.channel_id == channel_id:
+                return member
+        return None
+
+    def siblings(self, channel_id: int) -> list:
+        return [member for member in self.members if member.channel_id != channel_id and member.webhook_id]
+
+def _group_from_rows(rows: list):
+    if not rows:
+        return None
+    members = tuple(
+        GroupMember(
+            channel_id=int(row[0]),
+            guild_id=int(row[5]) if row[5] else None,
+            webhook_id=int(row[6]) if row[6] else None,
+            short_language=(row[7] or "").lower() or None,
+        )
+        for row in rows
+    )
+    return ChannelGroup(group_id=rows[0][9], members=members)
+
+class GroupCache:
+    def __init__(self, ttl: float = GROUP_CACHE_TTL, max_size: int = GROUP_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._by_channel = OrderedDict()  # channel_id -> (ChannelGroup ou None, chargé le)
+
+    async def get(self, channel_id: int, guild_id: int):
+        entry = self._by_channel.get(channel_id)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            self._by_channel.move_to_end(channel_id)
+            return entry[0]
+        group = _group_from_rows(await fetch_text_channel_group(channel_id, guild_id))
+        now = time.monotonic()
+        # Un chargement renseigne tous les salons du groupe
+        for member_id in ([member.channel_id for member in group.members] if group else [channel_id]):
+            self._by_channel[member_id] = (group, now)
+            self._by_channel.move_to_end(member_id)
+        while len(self._by_channel) > self.max_size:
+            self._by_channel.popitem(last=False)
+        return group
+
+    def invalidate_channel(self, channel_id: int):
+        """
+        Oublie le groupe du salon et de tous ses membres (salon supprimé, webhook changé...).
+        """
+        entry = self._by_channel.pop(channel_id, None)
+        if entry is not None and entry[0] is not None:
+            for member in entry[0].members:
+                self._by_channel.pop(member.channel_id, None)
+
+    def clear(self):
+        self._by_channel.clear()
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+class MessageRelay:
+    def __init__(self):
+        self.groups = GroupCache()
+
+    async def _deliver(self, member: GroupMember, text: str, src: str, author: discord.abc.User, attachments: list):
+        content = text
+        if text and member.short_language:
+            content = await translator.translate(text, src, member.short_language)
+        if attachments:
+            content = "\n".join(([content] if content else []) + attachments)
+        if not content:
+            return
+        await webhook_registry.send(
+            member.webhook_id,
+            member.channel_id,
+            _truncate(content, MAX_MESSAGE_LENGTH),
+            username=_truncate(f"{author.display_name} ({src.upper()})" if src else author.display_name, MAX_USERNAME_LENGTH),
+            avatar_url=author.display_avatar.url,
+            allowed_mentions=discord.AllowedMentions.none(),
+        )
+
+    async def handle_message(self, message: discord.Message) -> int:
+        """
+        Relaye un message vers les autres salons de son groupe. Retourne le nombre d'envois réussis.
+        """
+        if message.guild is None or message.webhook_id is not None or message.author.bot:
+            return 0
+        if not message.content and not message.attachments:
+            return 0
+        group = await self.groups.get(message.channel.id, message.guild.id)
+        if group is None:
+            return 0
+        origin = group.member(message.channel.id)
+        siblings = group.siblings(message.channel.id)
+        if origin is None or not siblings:
+            return 0
+
+        start = time.perf_counter()
+        attachments = [attachment.url for attachment in message.attachments]
+        results = await asyncio.gather(
+            *(self._deliver(member, message.content, origin.short_language, message.author, attachments) for member in siblings),
+            return_exceptions=True
+        )
+        delivered = 0
+        for member, result in zip(siblings, results):
+            if isinstance(result, WebhookUnavailable) and not result.fresh:
+                # Échec déjà signalé, mémorisé par le registre des webhooks
+                RELAY_DELIVERIES.inc(result="unavailable")
+            elif isinstance(result, Exception):
+                RELAY_DELIVERIES.inc(result="failed")
+                logger.warning(f"Relais vers le salon {member.channel_id} (webhook {member.webhook_id}) impossible : {result}")
+                if isinstance(result, WebhookUnavailable):
+                    # Webhook supprimé : la table sera relue au prochain message (Webhook_id remplacé ?) ;
+                    # les messages suivants voient l'échec mémorisé par le registre, sans relecture
+                    self.groups.invalidate_channel(member.channel_id)
+            else:
+                RELAY_DELIVERIES.inc(result="ok")
+                delivered += 1
+        if delivered:
+            RELAYED_MESSAGES.inc()
+        RELAY_SECONDS.observe(time.perf_counter() - start)
+        return delivered
+
+# Relais partagé (les webhooks sont résolus par webhook_registry, rattaché au bot)
+message_relay = MessageRelay()
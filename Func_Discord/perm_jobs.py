@@ -0,0 +1,522 @@
+# Func_Discord/perm_jobs.py
+
+import io
+import time
+import asyncio
+import logging
+import functools
+
+import discord
+
+from Func_Metrics.metrics import registry, span, log_event
+from Func_SQL.funcSQL_utils import fetch_text_channels_map
+from Func_SQL.funcSQL_categories import fetch_category_allocation, invalidate_category_allocations
+from Func_SQL.funcSQL_guilds import load_guild_config, add_languages
+from Func_SQL.funcSQL_jobs import (
+    create_job, fetch_job, fetch_active_jobs, update_job,
+    JOB_RUNNING, JOB_DONE, JOB_FAILED, JOB_CANCELLED, ACTIVE_STATUSES
+)
+from Func_Discord.api_executor import executor, WriteJob, channel_route
+from Func_Discord.perm_planner import plan_channel, build_roles_dict, discover_languages, RoutingRules
+from Func_Discord.perm_snapshots import capture_guild_permissions, save_snapshot_async, load_snapshot_async, plan_channel_rollback
+from Func_Discord.role_provisioning import provision_roles
+from Func_Discord.incremental_sync import incremental_sync, affected_channel_ids
+
+logger = logging.getLogger("perm_jobs")
+
+# ───────────────────────────────────────────────────────────────
+# Jobs de synchronisation / rollback en arrière-plan
+# ───────────────────────────────────────────────────────────────
+# Un job est enregistré dans la table PermissionJobs puis exécuté par une tâche
+# asyncio, indépendamment de l'interaction qui l'a lancé :
+# - les salons sont traités par id croissant, par lots de la taille de la
+#   concurrence de l'exécuteur ; le checkpoint (id du dernier salon traité) et
+#   les compteurs sont enregistrés après chaque lot ;
+# - au redémarrage, les jobs pending / running sont repris après le checkpoint ;
+# - la progression est publiée en éditant le message de suivi de l'interaction,
+#   puis, quand le jeton a expiré ou après un redémarrage, un message du salon ;
+# - /job_cancel annule la tâche et marque le job comme annulé ; un job d'un
+#   autre processus est annulé en base et s'arrête au contrôle suivant
+#   (CANCEL_CHECK_INTERVAL). Une tâche interrompue par l'arrêt du bot reste
+#   running en base et sera reprise au redémarrage.
+#
+# Un seul job est actif par serveur : une synchronisation demandée pendant une
+# autre synchronisation est rattachée au job en cours et reçoit son résultat ;
+# les autres combinaisons (rollback pendant une synchronisation...) sont
+# refusées (JobConflict). Les jobs repris au démarrage sont mis en file.
+# Les recalculs incrémentaux (allocation de catégorie, salons et rôles créés
+# ou renommés) demandés pendant un job du serveur sont différés à sa fin, pour
+# ne pas modifier les mêmes salons en même temps que lui.
+# ───────────────────────────────────────────────────────────────
+JOB_SYNC = "sync"
+JOB_ROLLBACK = "rollback"
+JOB_LABELS = {JOB_SYNC: "Synchronisation", JOB_ROLLBACK: "Rollback"}
+
+PROGRESS_INTERVAL = 5.0
+INTERACTION_TOKEN_LIFETIME = 14 * 60  # le jeton d'interaction expire après 15 minutes
+CHECKPOINT_EVERY = 50  # checkpoint forcé même si aucun salon n'est modifié
+CANCEL_CHECK_INTERVAL = 5.0  # relecture du statut en base (annulation depuis un autre processus)
+MAX_STORED_FAILURES = 50  # échecs conservés dans params pour le rapport final, toutes reprises comprises
+
+JOBS_FINISHED = registry.counter("tikana_jobs_finished_total", "Jobs terminés par type et statut", ("kind", "status"))
+JOB_CHANNELS = registry.counter("tikana_job_channels_total", "Salons traités par les jobs", ("kind", "result"))
+JOB_REQUESTS = registry.counter("tikana_job_requests_total", "Demandes de jobs (started, attached, rejected)", ("kind", "result"))
+
+class JobConflict(Exception):
+    """
+    Un job incompatible est déjà actif sur le serveur.
+    """
+    def __init__(self, job: dict):
+        super().__init__(f"Job #{job['job_id']} ({job['kind']}) déjà actif sur le serveur {job['guild_id']}")
+        self.job = job
+
+class ProgressPublisher:
+    def __init__(self, bot: discord.Client, job: dict, interaction: discord.Interaction = None):
+        self.bot = bot
+        self.job = job
+        self.interaction = interaction
+        self.interaction_message = None
+        self.followers = []  # interactions rattachées au job en cours d'exécution
+        self._last_publish = 0.0
+
+    def _interaction_valid(self) -> bool:
+        if self.interaction is None:
+            return False
+        return (discord.utils.utcnow() - self.interaction.created_at).total_seconds() < INTERACTION_TOKEN_LIFETIME
+
+    async def publish(self, content: str, force: bool = False, file: discord.File = None):
+        now = time.monotonic()
+        if not force and now - self._last_publish < PROGRESS_INTERVAL:
+            return
+        self._last_publish = now
+        try:
+            if self._interaction_valid():
+                if self.interaction_message is None or file is not None:
+                    kwargs = {"file": file} if file is not None else {}
+                    self.interaction_message = await self.interaction.followup.send(content, ephemeral=True, wait=True, **kwargs)
+                else:
+                    await self.interaction_message.edit(content=content)
+                return
+            channel = self.bot.get_channel(self.job["progress_channel_id"]) if self.job.get("progress_channel_id") else None
+            if channel is None:
+                return
+            message_id = self.job.get("progress_message_id")
+            if message_id and file is None:
+                await channel.get_partial_message(message_id).edit(content=content)
+            else:
+                kwargs = {"file": file} if file is not None else {}
+                message = await channel.send(content, **kwargs)
+                self.job["progress_message_id"] = message.id
+                await update_job(self.job["job_id"], progress_message_id=message.id)
+        except discord.HTTPException as e:
+            logger.warning(f"Impossible de publier la progression du job {self.job['job_id']} : {e}")
+
+    async def notify_followers(self, content: str):
+        """
+        Envoie le résultat final aux interactions rattachées au job (jeton encore valide).
+        """
+        for interaction in self.followers:
+            if (discord.utils.utcnow() - interaction.created_at).total_seconds() >= INTERACTION_TOKEN_LIFETIME:
+                continue
+            try:
+                await interaction.followup.send(content, ephemeral=True)
+            except discord.HTTPException as e:
+                logger.warning(f"Impossible de notifier une interaction rattachée au job {self.job['job_id']} : {e}")
+
+class JobManager:
+    def __init__(self):
+        self.bot = None
+        self._tasks = {}       # job_id -> asyncio.Task
+        self._publishers = {}  # job_id -> ProgressPublisher
+        self._active = {}      # guild_id -> job actif
+        self._queued = {}      # guild_id -> [job] en attente (reprises)
+        self._replan = {}      # guild_id -> {channel_id} à recalculer après le job actif
+        self._replan_roles = {}  # guild_id -> [discord.Role] créés / renommés pendant le job actif
+        self._guild_locks = {}
+        self._cancel_requested = set()  # job_id annulés par /job_cancel (≠ arrêt du bot)
+
+    def attach(self, bot: discord.Client):
+        self.bot = bot
+
+    # ───────────────────────────────────────────────────────────
+    # Lancement / reprise / annulation
+    # ───────────────────────────────────────────────────────────
+    async def submit(self, kind: str, guild: discord.Guild, params: dict = None, interaction: discord.Interaction = None) -> tuple:
+        """
+        Lance un job, ou rattache la demande à la synchronisation déjà active sur le serveur
+        (l'interaction recevra son résultat). Lève JobConflict si un autre job est actif.
+        Retourne (job_id, created).
+        """
+        lock = self._guild_locks.setdefault(guild.id, asyncio.Lock())
+        async with lock:
+            active = self._active.get(guild.id)
+            if active is None:
+                # Job enregistré mais pas encore repris (démarrage en cours) : il passe en premier
+                stored = await fetch_active_jobs([guild.id])
+                for job in stored:
+                    self._start(job)
+                active = self._active.get(guild.id)
+            if active is not None:
+                if kind == JOB_SYNC and active["kind"] == JOB_SYNC:
+                    if interaction is not None:
+                        self._publishers[active["job_id"]].followers.append(interaction)
+                    JOB_REQUESTS.inc(kind=kind, result="attached")
+                    return active["job_id"], False
+                JOB_REQUESTS.inc(kind=kind, result="rejected")
+                raise JobConflict(active)
+            progress_channel_id = interaction.channel_id if interaction is not None else None
+            job_id = await create_job(guild.id, kind, params, progress_channel_id)
+            job = await fetch_job(job_id)
+            self._start(job, interaction)
+            JOB_REQUESTS.inc(kind=kind, result="started")
+            return job_id, True
+
+    def _start(self, job: dict, interaction: discord.Interaction = None):
+        if job["job_id"] in self._tasks:
+            return
+        guild_id = job["guild_id"]
+        active = self._active.get(guild_id)
+        if active is not None:
+            if active["job_id"] != job["job_id"] and all(queued["job_id"] != job["job_id"] for queued in self._queued.get(guild_id, [])):
+                self._queued.setdefault(guild_id, []).append(job)
+            return
+        self._active[guild_id] = job
+        self._publishers[job["job_id"]] = ProgressPublisher(self.bot, job, interaction)
+        task = asyncio.create_task(self._run(job))
+        self._tasks[job["job_id"]] = task
+        task.add_done_callback(lambda done: self._finished(job, done))
+
+    def _finished(self, job: dict, task: asyncio.Task):
+        self._tasks.pop(job["job_id"], None)
+        self._publishers.pop(job["job_id"], None)
+        self._cancel_requested.discard(job["job_id"])
+        guild_id = job["guild_id"]
+        if self._active.get(guild_id) is job:
+            del self._active[guild_id]
+        if task.cancelled():
+            # Arrêt du bot : rien n'est relancé, les jobs seront repris au redémarrage
+            return
+        # Recalculs incrémentaux différés pendant le job
+        channel_ids = self._replan.pop(guild_id, None)
+        roles = self._replan_roles.pop(guild_id, [])
+        guild = self.bot.get_guild(guild_id)
+        if channel_ids and guild is not None:
+            incremental_sync.mark_channels(guild, channel_ids)
+        for role in roles:
+            incremental_sync.mark_role(role)
+        queued = self._queued.get(guild_id)
+        if queued:
+            self._start(queued.pop(0))
+            if not queued:
+                del self._queued[guild_id]
+
+    # ───────────────────────────────────────────────────────────
+    # Recalculs incrémentaux (différés pendant un job du serveur)
+    # ───────────────────────────────────────────────────────────
+    def mark_channels(self, guild: discord.Guild, channel_ids):
+        """
+        Salons à recalculer ; pendant un job du serveur, le plan en cours est peut-être déjà
+        appliqué à ces salons : ils sont recalculés à la fin du job.
+        """
+        if guild.id in self._active:
+            self._replan.setdefault(guild.id, set()).update(channel_ids)
+        else:
+            incremental_sync.mark_channels(guild, channel_ids)
+
+    def mark_channel(self, channel):
+        """Un salon créé, renommé ou déplacé (une catégorie entraîne ses salons enfants)."""
+        self.mark_channels(channel.guild, affected_channel_ids(channel))
+
+    def mark_category(self, category: discord.CategoryChannel):
+        """Une catégorie (ré)allouée à une guilde de jeu."""
+        self.mark_channel(category)
+
+    def mark_role(self, role: discord.Role):
+        """Un rôle Role_<prefix>_<lang> créé ou renommé."""
+        if role.guild.id in self._active:
+            self._replan_roles.setdefault(role.guild.id, []).append(role)
+        else:
+            incremental_sync.mark_role(role)
+
+    async def wait(self, job_id: int):
+        """
+        Attend la fin d'un job lancé par ce processus (sans effet s'il est déjà terminé).
+        """
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def resume_all(self):
+        """
+        Reprend les jobs interrompus (pending / running) des serveurs gérés par ce processus.
+        """
+        jobs = await fetch_active_jobs([guild.id for guild in self.bot.guilds])
+        for job in jobs:
+            if job["job_id"] not in self._tasks:
+                logger.info(f"Reprise du job {job['job_id']} ({job['kind']}) après le salon {job['checkpoint']}")
+                self._start(job)
+        return len(jobs)
+
+    async def cancel(self, job_id: int) -> bool:
+        """
+        Annule un job actif ; retourne False s'il n'existe pas ou est déjà terminé.
+        """
+        task = self._tasks.get(job_id)
+        if task is not None:
+            self._cancel_requested.add(job_id)
+            task.cancel()
+            return True
+        for guild_id, queued in list(self._queued.items()):
+            for job in queued:
+                if job["job_id"] == job_id:
+                    queued.remove(job)
+                    if not queued:
+                        del self._queued[guild_id]
+                    await update_job(job_id, status=JOB_CANCELLED)
+                    return True
+        job = await fetch_job(job_id)
+        if job is None or job["status"] not in ACTIVE_STATUSES:
+            return False
+        # Job d'un autre processus : il relit son statut à chaque checkpoint et s'arrête
+        await update_job(job_id, status=JOB_CANCELLED)
+        return True
+
+    async def shutdown(self):
+        """
+        Interrompt les jobs de ce processus à l'arrêt du bot, sans les marquer annulés.
+        """
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # ───────────────────────────────────────────────────────────
+    # Exécution
+    # ───────────────────────────────────────────────────────────
+    async def _run(self, job: dict):
+        job_id = job["job_id"]
+        publisher = self._publishers[job_id]
+        label = JOB_LABELS.get(job["kind"], job["kind"])
+        guild = self.bot.get_guild(job["guild_id"])
+        if guild is None:
+            await update_job(job_id, status=JOB_FAILED, error="Serveur introuvable")
+            return
+        status = JOB_FAILED
+        try:
+            await update_job(job_id, status=JOB_RUNNING)
+            await publisher.publish(f"⏳ {label} (job #{job_id}) en cours…", force=True)
+            with span(job["kind"], "total", guild=guild.id, job=job_id):
+                if job["kind"] == JOB_SYNC:
+                    summary = await self._run_sync(job, guild, publisher)
+                elif job["kind"] == JOB_ROLLBACK:
+                    summary = await self._run_rollback(job, guild, publisher)
+                else:
+                    raise ValueError(f"Type de job inconnu : {job['kind']}")
+            status = JOB_DONE
+            await update_job(job_id, status=JOB_DONE)
+            await publisher.publish(summary["message"], force=True, file=summary.get("file"))
+            await publisher.notify_followers(summary["message"])
+        except asyncio.CancelledError:
+            if job_id not in self._cancel_requested:
+                # Arrêt ou redémarrage : le job reste running en base pour être repris
+                status = "interrupted"
+                logger.info(f"Job {job_id} interrompu après le salon {job['checkpoint']}, reprise au redémarrage")
+                raise
+            status = JOB_CANCELLED
+            await update_job(job_id, status=JOB_CANCELLED)
+            message = f"🛑 {label} (job #{job_id}) annulé après **{job['done']}/{job['total']}** salons."
+            await publisher.publish(message, force=True)
+            await publisher.notify_followers(message)
+        except Exception as e:
+            logger.exception(f"Erreur pendant le job {job_id}")
+            await update_job(job_id, status=JOB_FAILED, error=str(e)[:1000])
+            message = f"❌ {label} (job #{job_id}) en échec : {e}"
+            await publisher.publish(message, force=True)
+            await publisher.notify_followers(message)
+        finally:
+            JOBS_FINISHED.inc(kind=job["kind"], status=status)
+            log_event("job.finished", job=job_id, kind=job["kind"], guild=guild.id, status=status,
+                      done=job["done"], total=job["total"], changed=job["changed"], failed=job["failed"])
+
+    async def _process_channels(self, job: dict, guild: discord.Guild, plan_write, publisher: ProgressPublisher, label: str) -> list:
+        """
+        Parcourt les salons par id croissant après le checkpoint. plan_write(channel) retourne
+        un WriteJob si le salon doit être modifié, sinon None. Retourne les résultats de cette exécution ;
+        les échecs de toutes les exécutions (reprises comprises) sont dans params["failures"].
+        """
+        channels = sorted(guild.channels, key=lambda channel: channel.id)
+        job["total"] = len(channels)
+        await update_job(job["job_id"], total=job["total"])
+        checkpoint = job["checkpoint"] or 0
+        results = []
+        batch = []
+        last_seen = checkpoint
+        since_checkpoint = 0
+        last_status_check = time.monotonic()
+
+        async def flush():
+            nonlocal batch, since_checkpoint, last_status_check
+            batch_results = await executor.run(batch) if batch else []
+            for result in batch_results:
+                if result.ok:
+                    job["changed"] += 1
+                else:
+                    job["failed"] += 1
+            results.extend(batch_results)
+            failures = job["params"].setdefault("failures", [])
+            stored_failures = len(failures)
+            for result in batch_results:
+                if not result.ok and len(failures) < MAX_STORED_FAILURES:
+                    failures.append([result.label, str(result.error)])
+            changed = sum(1 for result in batch_results if result.ok)
+            JOB_CHANNELS.inc(changed, kind=job["kind"], result="changed")
+            JOB_CHANNELS.inc(len(batch_results) - changed, kind=job["kind"], result="failed")
+            JOB_CHANNELS.inc(since_checkpoint - len(batch_results), kind=job["kind"], result="unchanged")
+            job["done"] += since_checkpoint
+            job["checkpoint"] = last_seen
+            batch = []
+            since_checkpoint = 0
+            extra = {"params": job["params"]} if len(failures) > stored_failures else {}
+            await update_job(job["job_id"], done=job["done"], changed=job["changed"],
+                             failed=job["failed"], checkpoint=job["checkpoint"], **extra)
+            if time.monotonic() - last_status_check >= CANCEL_CHECK_INTERVAL:
+                last_status_check = time.monotonic()
+                stored = await fetch_job(job["job_id"])
+                if stored is not None and stored["status"] == JOB_CANCELLED:
+                    # Annulé depuis un autre processus (/job_cancel)
+                    self._cancel_requested.add(job["job_id"])
+                    raise asyncio.CancelledError
+            await publisher.publish(
+                f"⏳ {label} (job #{job['job_id']}) : **{job['done']}/{job['total']}** salons, "
+                f"{job['changed']} modifiés, {job['failed']} en échec"
+            )
+
+        job["done"] = sum(1 for channel in channels if channel.id <= checkpoint)
+        for channel in channels:
+            if channel.id <= checkpoint:
+                continue
+            write = await plan_write(channel)
+            if write is not None:
+                batch.append(write)
+            last_seen = channel.id
+            since_checkpoint += 1
+            if len(batch) >= executor.concurrency or since_checkpoint >= CHECKPOINT_EVERY:
+                await flush()
+        await flush()
+        return results
+
+    async def _run_sync(self, job: dict, guild: discord.Guild, publisher: ProgressPublisher) -> dict:
+        params = job["params"]
+        fields = {"guild": guild.id, "job": job["job_id"]}
+        # Étape 0 : snapshot (une seule fois, conservé en cas de reprise)
+        if "backup_version" not in params:
+            with span("sync", "backup", **fields):
+                params["backup_version"] = await save_snapshot_async(guild.id, capture_guild_permissions(guild))
+                await update_job(job["job_id"], params=params)
+
+        # Étape 1 : langues depuis la DB
+        with span("sync", "languages", **fields):
+            config = await load_guild_config(guild.id)
+            text_channels = await fetch_text_channels_map(channel_ids=[channel.id for channel in guild.channels])
+            discovered = discover_languages(text_channels, config["languages"])
+            if discovered:
+                await add_languages(guild.id, discovered)
+                config["languages"].update(discovered)
+
+        # Étape 2 : rôles manquants puis mapping des rôles
+        with span("sync", "roles", **fields):
+            provisioning = await provision_roles(guild, config)
+        with span("sync", "role_map", **fields):
+            rules = RoutingRules(build_roles_dict(guild, config))
+        if provisioning["created"]:
+            log_event("sync.roles_created", guild=guild.id, roles=",".join(provisioning["created"]))
+
+        # Étape 3 : plan et application par lots
+        invalidate_category_allocations(guild.id)
+
+        async def get_allocation(category_id: int):
+            return await fetch_category_allocation(category_id, guild.id)
+
+        ambiguous = 0
+
+        async def plan_write(channel):
+            nonlocal ambiguous
+            plan = await plan_channel(channel, guild, rules, text_channels, get_allocation)
+            if plan is None:
+                return None
+            if plan.ambiguous:
+                ambiguous += 1
+            if not plan.changed:
+                return None
+            return WriteJob(
+                route=channel_route(channel),
+                factory=functools.partial(channel.edit, overwrites=plan.desired),
+                label=f"{channel.name} ({plan.reason})"
+            )
+
+        with span("sync", "apply", **fields):
+            results = await self._process_channels(job, guild, plan_write, publisher, "Synchronisation")
+        for result in results:
+            if not result.ok:
+                log_event("sync.channel_failed", logging.WARNING, guild=guild.id, channel=result.label, error=result.error)
+        unchanged = job["done"] - job["changed"] - job["failed"]
+        message = (
+            f"✅ Permissions synchronisées (job #{job['job_id']}, backup v{params['backup_version']}) : "
+            f"**{job['changed']}** salons modifiés, **{unchanged}** inchangés ou ignorés, **{job['failed']}** en échec"
+            + (f", **{ambiguous}** ambigus (voir les logs)." if ambiguous else ".")
+        )
+        return {"message": message}
+
+    async def _run_rollback(self, job: dict, guild: discord.Guild, publisher: ProgressPublisher) -> dict:
+        params = job["params"]
+        fields = {"guild": guild.id, "job": job["job_id"]}
+        with span("rollback", "load", **fields):
+            snapshot = await load_snapshot_async(guild.id, params.get("version"))
+        if not snapshot:
+            return {"message": "ℹ️ Aucun backup n'a été trouvé."}
+        version, backup_data = snapshot
+        if params.get("version") != version:
+            params["version"] = version
+            await update_job(job["job_id"], params=params)
+
+        async def plan_write(channel):
+            overwrites = plan_channel_rollback(guild, backup_data, channel)
+            if overwrites is None:
+                return None
+            return WriteJob(
+                route=channel_route(channel),
+                factory=functools.partial(channel.edit, overwrites=overwrites),
+                label=f"{channel.name} ({channel.id})"
+            )
+
+        with span("rollback", "apply", **fields):
+            results = await self._process_channels(job, guild, plan_write, publisher, "Rollback")
+        for result in results:
+            if not result.ok:
+                log_event("rollback.channel_failed", logging.WARNING, guild=guild.id, channel=result.label, error=result.error)
+        # Rapport construit depuis la base : il couvre aussi les exécutions précédant une reprise
+        failures = params.get("failures", [])
+        unchanged = job["done"] - job["changed"] - job["failed"]
+        message = (
+            f"✅ Backup v{version} (job #{job['job_id']}) : **{job['changed']}** salons restaurés, "
+            f"**{unchanged}** déjà conformes, **{job['failed']}** en échec."
+        )
+        for channel_label, error in failures[:10]:
+            message += f"\n• ❌ {channel_label} : {error}"
+        if job["failed"] > 10:
+            message += f"\n• … et {job['failed'] - 10} autres"
+        file = None
+        if failures:
+            report_lines = [
+                f"Rollback vers le backup v{version}",
+                f"{job['changed']} restaurés, {unchanged} déjà conformes, {job['failed']} en échec",
+                "",
+            ]
+            report_lines += [f"{channel_label} : ÉCHEC ({error})" for channel_label, error in failures]
+            if job["failed"] > len(failures):
+                report_lines.append(f"… et {job['failed'] - len(failures)} autres (voir les logs)")
+            file = discord.File(io.BytesIO("\n".join(report_lines).encode("utf-8")), filename=f"rollback_v{version}.txt")
+        return {"message": message, "file": file}
+
+# Gestionnaire partagé, rattaché au bot au démarrage
+job_manager = JobManager()
@@ -0,0 +1,207 @@
+# Func_Discord/perm_planner.py
+
+import functools
+
+import discord
+import googletrans
+from dataclasses import dataclass, field
+
+from Func_Discord.api_executor import executor, WriteJob, channel_route
+from Func_Discord.guild_index import guild_index
+from Func_Discord.prefix_matcher import PrefixMatcher
+
+# ───────────────────────────────────────────────────────────────
+# Planification des permissions de /sync_channels
+# ───────────────────────────────────────────────────────────────
+# Le planificateur calcule, pour chaque salon, le jeu d'overwrites souhaité
+# puis le compare à channel.overwrites. Seuls les salons réellement différents
+# doivent être modifiés, en un seul channel.edit(overwrites=...).
+# ───────────────────────────────────────────────────────────────
+
+@dataclass
+class ChannelPlan:
+    channel: discord.abc.GuildChannel
+    desired: dict = field(default_factory=dict)
+    changed: bool = False
+    reason: str = ""
+    ambiguous: tuple = ()
+
+def overwrite_key(overwrites: dict) -> dict:
+    """
+    Représentation comparable d'un dictionnaire d'overwrites : {target_id: (allow, deny)}.
+    """
+    result = {}
+    for target, overwrite in overwrites.items():
+        allow, deny = overwrite.pair()
+        result[target.id] = (allow.value, deny.value)
+    return result
+
+def overwrites_equal(current: dict, desired: dict) -> bool:
+    return overwrite_key(current) == overwrite_key(desired)
+
+def build_desired_overwrites(channel, default_role: discord.Role, lang_roles: dict, short_lang: str = None) -> dict:
+    """
+    Calcule les overwrites souhaités pour un salon :
+    - le rôle @everyone ne voit pas le salon ;
+    - pour une catégorie (short_lang None), tous les rôles de langue voient le salon ;
+    - pour un salon, seul le rôle de la langue du salon le voit, les autres rôles de langue non ;
+    - les autres rôles gardent leur overwrite avec view_channel remis à None ;
+    - les overwrites des membres sont conservés tels quels.
+    """
+    current = channel.overwrites
+    desired = dict(current)
+    lang_role_set = set(lang_roles.values())
+
+    for target, overw in current.items():
+        if isinstance(target, discord.Role) and target not in lang_role_set and target != default_role:
+            new_overwrite = discord.PermissionOverwrite.from_pair(*overw.pair())
+            new_overwrite.view_channel = None
+            desired[target] = new_overwrite
+
+    desired[default_role] = discord.PermissionOverwrite(view_channel=False)
+    for lang_code, role in lang_roles.items():
+        visible = short_lang is None or lang_code.upper() == short_lang
+        desired[role] = discord.PermissionOverwrite(view_channel=visible)
+    return desired
+
+def discover_languages(text_channels: dict, languages: dict) -> dict:
+    """
+    Retourne les langues {code: nom} des TextChannel absentes de languages.
+    """
+    discovered = {}
+    for ch_data in text_channels.values():
+        short_lang = ch_data[7]  # Index à vérifier selon votre DB
+        if short_lang:
+            lang_code = short_lang.upper()
+            if lang_code not in languages and lang_code not in discovered:
+                discovered[lang_code] = googletrans.LANGUAGES.get(lang_code.lower(), lang_code).title()
+    return discovered
+
+def role_name_for(base_prefix: str, lang_code: str) -> str:
+    return f"Role_{base_prefix}_{lang_code}"
+
+def build_roles_dict(guild: discord.Guild, config: dict, report_missing: bool = True) -> dict:
+    """
+    Construit le mapping {base_prefix: {lang_code: rôle}} à partir de la config du serveur.
+    """
+    roles_by_name = guild_index.get(guild).roles_by_name
+    roles_dict = {}
+    for g_config in config.get("guildes", {}).values():
+        base_prefix = g_config.get("base_prefix")
+        lang_roles = {}
+        for lang_code in config.get("languages", {}):
+            role_name = role_name_for(base_prefix, lang_code)
+            role = roles_by_name.get(role_name)
+            if role:
+                lang_roles[lang_code] = role
+            elif report_missing:
+                print(f"Rôle non trouvé : {role_name}")
+        roles_dict[base_prefix] = lang_roles
+    return roles_dict
+
+def _fallback_owners(roles_dict: dict) -> dict:
+    """
+    {lang_code: base_prefix} de la première guilde de jeu possédant un rôle pour chaque langue.
+    """
+    owners = {}
+    for base_prefix, lang_roles in roles_dict.items():
+        for lang_code in lang_roles:
+            owners.setdefault(lang_code, base_prefix)
+    return owners
+
+class RoutingRules:
+    """
+    Règles de routage compilées une fois par synchronisation (complète ou incrémentale).
+    """
+    def __init__(self, roles_dict: dict):
+        self.roles_dict = roles_dict
+        self.matcher = PrefixMatcher.from_roles_dict(roles_dict)
+        self.fallback_owners = _fallback_owners(roles_dict)
+
+async def resolve_channel_rule(channel, rules: RoutingRules, text_channels: dict, get_allocation):
+    """
+    Détermine la règle à appliquer à un salon.
+    Retourne (lang_roles, short_lang, raison, guildes candidates) ou None si le salon doit être ignoré.
+    get_allocation est une coroutine (category_id) -> allocation ou None.
+    """
+    roles_dict = rules.roles_dict
+
+    # Cas des catégories
+    if isinstance(channel, discord.CategoryChannel):
+        match = rules.matcher.match_base(channel.name)
+        if match is not None:
+            return roles_dict[match.base_prefix], None, f"catégorie préfixée {match.base_prefix}", match.candidates
+        allocation = await get_allocation(channel.id)
+        if allocation:
+            return roles_dict.get(allocation[1], {}), None, f"catégorie allouée à {allocation[1]}", ()
+        return {}, None, "catégorie sans guilde", ()
+
+    # Cas des salons classiques
+    ch_data = text_channels.get(channel.id)
+    if not ch_data:
+        return None
+    short_lang = ch_data[7]
+    if not short_lang:
+        return None
+    short_lang = short_lang.upper()
+
+    match = rules.matcher.match_full(channel.name, short_lang)
+    if match is not None:
+        return roles_dict[match.base_prefix], short_lang, "préfixe complet", match.candidates
+
+    if channel.category is not None:
+        allocation = await get_allocation(channel.category.id)
+        if allocation:
+            return roles_dict.get(allocation[1], {}), short_lang, "catégorie allouée", ()
+
+    # Fallback : première guilde de jeu possédant un rôle pour la langue du salon
+    base_prefix = rules.fallback_owners.get(short_lang)
+    if base_prefix is not None:
+        return roles_dict[base_prefix], short_lang, f"fallback général ({base_prefix})", ()
+    return None
+
+async def plan_channel(channel, guild: discord.Guild, rules: RoutingRules, text_channels: dict, get_allocation):
+    """
+    Construit le plan d'un salon, ou None si aucune règle ne s'applique.
+    """
+    rule = await resolve_channel_rule(channel, rules, text_channels, get_allocation)
+    if rule is None:
+        return None
+    lang_roles, short_lang, reason, candidates = rule
+    desired = build_desired_overwrites(channel, guild.default_role, lang_roles, short_lang)
+    plan = ChannelPlan(
+        channel=channel,
+        desired=desired,
+        changed=not overwrites_equal(channel.overwrites, desired),
+        reason=reason,
+        ambiguous=candidates if len(candidates) > 1 else ()
+    )
+    if plan.ambiguous:
+        print(f"Salon {channel.name} ambigu entre les guildes {', '.join(plan.ambiguous)} : {plan.ambiguous[0]} retenue.")
+    return plan
+
+async def apply_plans(plans: list, on_progress=None) -> dict:
+    """
+    Applique les plans modifiés via l'exécuteur partagé (un channel.edit par salon).
+    Retourne un résumé {changed, unchanged, failed, results}.
+    """
+    jobs = [
+        WriteJob(
+            route=channel_route(plan.channel),
+            factory=functools.partial(plan.channel.edit, overwrites=plan.desired),
+            label=f"{plan.channel.name} ({plan.reason})"
+        )
+        for plan in plans if plan.changed
+    ]
+    results = await executor.run(jobs, on_progress=on_progress)
+    changed = sum(1 for result in results if result.ok)
+    for result in results:
+        if not result.ok:
+            print(f"Erreur configuration salon {result.label}: {result.error}")
+    return {
+        "changed": changed,
+        "unchanged": len(plans) - len(jobs),
+        "failed": len(results) - changed,
+        "ambiguous": sum(1 for plan in plans if plan.ambiguous),
+        "results": results,
+    }
@@ -0,0 +1,354 @@
+# Func_Discord/perm_snapshots.py
+
+import os
+import json
+import gzip
+import asyncio
+import hashlib
+import datetime
+import threading
+
+import discord
+
+from Func_Config.persistence import atomic_write_bytes, atomic_write_json, read_json
+from Func_Config.server_config import get_server_folder
+
+# ───────────────────────────────────────────────────────────────
+# Stockage versionné des snapshots de permissions
+# ───────────────────────────────────────────────────────────────
+# Un snapshot est un dictionnaire {channel_id: {target_id: (type, allow, deny)}}
+# où type vaut 0 pour un rôle et 1 pour un membre (comme l'API Discord) et
+# allow/deny sont les bitmasks entiers de l'overwrite.
+#
+# Guilds/<server_id>/snapshots/
+#   index.json        liste des versions (numéro, date, type, empreinte)
+#   v000001.json.gz   snapshot complet
+#   v000002.json.gz   delta par rapport à la version précédente
+#
+# Un snapshot complet est écrit toutes les SNAPSHOT_FULL_EVERY versions, les
+# autres sont des deltas. Au-delà de SNAPSHOT_RETENTION versions, les plus
+# anciennes sont supprimées (la plus ancienne conservée est réécrite en complet).
+#
+# Les écritures sont atomiques et les fonctions *_async exécutent le stockage
+# hors de la boucle asyncio.
+# ───────────────────────────────────────────────────────────────
+SNAPSHOT_RETENTION = 20
+SNAPSHOT_FULL_EVERY = 10
+
+TARGET_ROLE = 0
+TARGET_MEMBER = 1
+
+LEGACY_BACKUP_FILE = "permissions_backup.json"
+
+def get_snapshot_folder(server_id: int, create: bool = False) -> str:
+    """
+    Dossier des snapshots ; seules les écritures le créent (create=True).
+    """
+    folder = os.path.join(get_server_folder(server_id, create=create), "snapshots")
+    if create:
+        os.makedirs(folder, exist_ok=True)
+    return folder
+
+# ───────────────────────────────────────────────────────────────
+# Capture et comparaison
+# ───────────────────────────────────────────────────────────────
+def capture_overwrites(channel) -> dict:
+    """
+    Overwrites d'un salon sous forme {target_id: (type, allow, deny)}.
+    """
+    result = {}
+    for target, overwrite in channel.overwrites.items():
+        if isinstance(target, discord.Role):
+            target_type = TARGET_ROLE
+        elif isinstance(target, discord.Member):
+            target_type = TARGET_MEMBER
+        else:
+            continue
+        allow, deny = overwrite.pair()
+        result[target.id] = (target_type, allow.value, deny.value)
+    return result
+
+def capture_guild_permissions(guild: discord.Guild) -> dict:
+    return {channel.id: capture_overwrites(channel) for channel in guild.channels}
+
+def state_digest(state: dict) -> str:
+    """
+    Empreinte canonique d'un snapshot, pour comparer rapidement deux états.
+    """
+    hasher = hashlib.sha1()
+    for channel_id in sorted(state):
+        hasher.update(f"{channel_id}:".encode())
+        for target_id, (target_type, allow, deny) in sorted(state[channel_id].items()):
+            hasher.update(f"{target_id},{target_type},{allow},{deny};".encode())
+        hasher.update(b"|")
+    return hasher.hexdigest()
+
+def build_overwrites(guild: discord.Guild, channel_state: dict) -> dict:
+    """
+    Reconstruit le dictionnaire d'overwrites discord.py d'un salon à partir du snapshot.
+    Les rôles et membres disparus sont ignorés.
+    """
+    overwrites = {}
+    for target_id, (target_type, allow, deny) in channel_state.items():
+        if target_type == TARGET_ROLE:
+            target = guild.get_role(target_id)
+        else:
+            target = guild.get_member(target_id)
+        if target is not None:
+            overwrites[target] = discord.PermissionOverwrite.from_pair(discord.Permissions(allow), discord.Permissions(deny))
+    return overwrites
+
+# ───────────────────────────────────────────────────────────────
+# Sérialisation
+# ───────────────────────────────────────────────────────────────
+def _encode_channels(channels: dict) -> dict:
+    return {
+        str(channel_id): {str(target_id): list(value) for target_id, value in overwrites.items()}
+        for channel_id, overwrites in channels.items()
+    }
+
+def _decode_channels(channels: dict) -> dict:
+    return {
+        int(channel_id): {int(target_id): tuple(value) for target_id, value in overwrites.items()}
+        for channel_id, overwrites in channels.items()
+    }
+
+def _version_path(server_id: int, version: int, create: bool = False) -> str:
+    return os.path.join(get_snapshot_folder(server_id, create), f"v{version:06d}.json.gz")
+
+def _index_path(server_id: int, create: bool = False) -> str:
+    return os.path.join(get_snapshot_folder(server_id, create), "index.json")
+
+def _write_json_gz(path: str, data: dict):
+    atomic_write_bytes(path, gzip.compress(json.dumps(data, separators=(",", ":")).encode("utf-8")))
+
+def _read_json_gz(path: str) -> dict:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+def _load_index(server_id: int) -> dict:
+    """
+    Index des versions (vide si le serveur n'a aucun snapshot). Lecture seule.
+    """
+    index = read_json(_index_path(server_id))
+    if index is not None:
+        return index
+    return {"versions": [], "next": 1}
+
+def _load_index_for_write(server_id: int) -> dict:
+    """
+    Comme _load_index, mais un store encore inexistant reprend d'abord l'ancien backup en version 1.
+    """
+    index = read_json(_index_path(server_id))
+    if index is not None:
+        return index
+    index = {"versions": [], "next": 1}
+    _import_legacy_backup(server_id, index)
+    return index
+
+def _save_index(server_id: int, index: dict):
+    atomic_write_json(_index_path(server_id, create=True), index)
+
+def _import_legacy_backup(server_id: int, index: dict):
+    """
+    Convertit l'ancien permissions_backup.json (dicts _values) en version 1 du store.
+    """
+    path = os.path.join(get_server_folder(server_id, create=False), LEGACY_BACKUP_FILE)
+    if not os.path.exists(path):
+        return
+    try:
+        legacy = read_json(path, default={})
+        state = {}
+        for channel_id, overwrites in legacy.items():
+            channel_state = {}
+            for target_id, data in overwrites.items():
+                target_type = {"role": TARGET_ROLE, "member": TARGET_MEMBER}.get(data.get("target_type"))
+                if target_type is None:
+                    continue
+                allow, deny = discord.PermissionOverwrite(**data.get("permissions", {})).pair()
+                channel_state[int(target_id)] = (target_type, allow.value, deny.value)
+            state[int(channel_id)] = channel_state
+        _append_version(server_id, index, state)
+    except Exception as e:
+        print(f"Erreur lors de l'import de l'ancien backup du serveur {server_id} : {e}")
+
+# ───────────────────────────────────────────────────────────────
+# Écriture / lecture des versions
+# ───────────────────────────────────────────────────────────────
+def _delta(previous: dict, state: dict) -> dict:
+    changed = {
+        channel_id: overwrites for channel_id, overwrites in state.items()
+        if previous.get(channel_id) != overwrites
+    }
+    removed = [channel_id for channel_id in previous if channel_id not in state]
+    return {"set": _encode_channels(changed), "removed": [str(channel_id) for channel_id in removed]}
+
+def _materialize(server_id: int, index: dict, version: int) -> dict:
+    """
+    Reconstruit l'état complet d'une version en rejouant les deltas depuis le dernier complet.
+    """
+    entries = [entry for entry in index["versions"] if entry["version"] <= version]
+    if not entries or entries[-1]["version"] != version:
+        return None
+    start = max(i for i, entry in enumerate(entries) if entry["kind"] == "full")
+    state = {}
+    for entry in entries[start:]:
+        data = _read_json_gz(_version_path(server_id, entry["version"]))
+        if entry["kind"] == "full":
+            state = _decode_channels(data["channels"])
+        else:
+            state.update(_decode_channels(data["set"]))
+            for channel_id in data["removed"]:
+                state.pop(int(channel_id), None)
+    return state
+
+def _append_version(server_id: int, index: dict, state: dict) -> int:
+    version = index["next"]
+    versions = index["versions"]
+    since_full = 0
+    for entry in reversed(versions):
+        if entry["kind"] == "full":
+            break
+        since_full += 1
+    if not versions or since_full + 1 >= SNAPSHOT_FULL_EVERY:
+        kind = "full"
+        _write_json_gz(_version_path(server_id, version, create=True), {"channels": _encode_channels(state)})
+    else:
+        kind = "delta"
+        previous = _materialize(server_id, index, versions[-1]["version"])
+        _write_json_gz(_version_path(server_id, version, create=True), _delta(previous, state))
+    versions.append({
+        "version": version,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "kind": kind,
+        "digest": state_digest(state),
+        "channels": len(state),
+    })
+    index["next"] = version + 1
+    _prune(server_id, index)
+    _save_index(server_id, index)
+    return version
+
+def _prune(server_id: int, index: dict):
+    versions = index["versions"]
+    if len(versions) <= SNAPSHOT_RETENTION:
+        return
+    oldest_kept = versions[len(versions) - SNAPSHOT_RETENTION]
+    if oldest_kept["kind"] != "full":
+        state = _materialize(server_id, index, oldest_kept["version"])
+        _write_json_gz(_version_path(server_id, oldest_kept["version"]), {"channels": _encode_channels(state)})
+        oldest_kept["kind"] = "full"
+    for entry in versions[:len(versions) - SNAPSHOT_RETENTION]:
+        try:
+            os.remove(_version_path(server_id, entry["version"]))
+        except OSError:
+            pass
+    index["versions"] = versions[len(versions) - SNAPSHOT_RETENTION:]
+
+_server_locks = {}
+_server_locks_guard = threading.Lock()
+
+def _server_lock(server_id: int) -> threading.Lock:
+    with _server_locks_guard:
+        return _server_locks.setdefault(server_id, threading.Lock())
+
+def save_snapshot(server_id: int, state: dict) -> int:
+    """
+    Enregistre un snapshot et retourne son numéro de version.
+    Si l'état est identique à la dernière version, aucune version n'est créée.
+    """
+    with _server_lock(server_id):
+        index = _load_index_for_write(server_id)
+        if index["versions"] and index["versions"][-1]["digest"] == state_digest(state):
+            return index["versions"][-1]["version"]
+        return _append_version(server_id, index, state)
+
+def load_snapshot(server_id: int, version: int = None):
+    """
+    Retourne (version, état) pour la version demandée (la dernière par défaut), ou None.
+    """
+    with _server_lock(server_id):
+        index = _load_index(server_id)
+        if not index["versions"]:
+            return None
+        if version is None:
+            version = index["versions"][-1]["version"]
+        state = _materialize(server_id, index, version)
+    if state is None:
+        return None
+    return version, state
+
+def list_snapshots(server_id: int) -> list:
+    """
+    Liste des versions disponibles (de la plus ancienne à la plus récente).
+    """
+    with _server_lock(server_id):
+        return list(_load_index(server_id)["versions"])
+
+def import_legacy_backups(server_ids: list) -> int:
+    """
+    Reprend l'ancien permissions_backup.json des serveurs qui n'ont pas encore de store
+    (migration unique au démarrage ; save_snapshot le fait aussi pour les autres serveurs).
+    Retourne le nombre de backups importés.
+    """
+    imported = 0
+    for server_id in server_ids:
+        legacy_path = os.path.join(get_server_folder(server_id, create=False), LEGACY_BACKUP_FILE)
+        if not os.path.exists(legacy_path) or os.path.exists(_index_path(server_id)):
+            continue
+        with _server_lock(server_id):
+            if _load_index_for_write(server_id)["versions"]:
+                imported += 1
+    return imported
+
+def matches_live_state(versions: list, guild: discord.Guild, version: int = None) -> bool:
+    """
+    Indique si une version (la dernière par défaut) de la liste list_snapshots correspond
+    exactement à l'état actuel du serveur (comparaison des empreintes, sans lire le snapshot).
+    """
+    if version is None and versions:
+        version = versions[-1]["version"]
+    for entry in versions:
+        if entry["version"] == version:
+            return entry["digest"] == state_digest(capture_guild_permissions(guild))
+    return False
+
+async def save_snapshot_async(server_id: int, state: dict) -> int:
+    return await asyncio.to_thread(save_snapshot, server_id, state)
+
+async def load_snapshot_async(server_id: int, version: int = None):
+    return await asyncio.to_thread(load_snapshot, server_id, version)
+
+async def list_snapshots_async(server_id: int) -> list:
+    return await asyncio.to_thread(list_snapshots, server_id)
+
+async def import_legacy_backups_async(server_ids: list) -> int:
+    return await asyncio.to_thread(import_legacy_backups, server_ids)
+
+# ───────────────────────────────────────────────────────────────
+# Rollback différentiel
+# ───────────────────────────────────────────────────────────────
+def _restorable_state(guild: discord.Guild, channel_state: dict) -> dict:
+    """
+    Filtre les cibles qui n'existent plus (rôles supprimés, membres partis),
+    qui ne peuvent de toute façon pas être restaurées.
+    """
+    result = {}
+    for target_id, value in channel_state.items():
+        target_type = value[0]
+        if target_type == TARGET_ROLE and guild.get_role(target_id) is None:
+            continue
+        if target_type == TARGET_MEMBER and guild.get_member(target_id) is None:
+            continue
+        result[target_id] = tuple(value)
+    return result
+
+def plan_channel_rollback(guild: discord.Guild, state: dict, channel):
+    """
+    Overwrites à appliquer pour ramener un salon au snapshot, ou None s'il est déjà conforme.
+    Les salons absents du snapshot sont remis sans overwrites, comme auparavant.
+    """
+    target_state = _restorable_state(guild, state.get(channel.id, {}))
+    if capture_overwrites(channel) == target_state:
+        return None
+    return build_overwrites(guild, target_state)
@@ -0,0 +1,83 @@
+# Func_Discord/prefix_matcher.py
+
+from dataclasses import dataclass
+
+# ───────────────────────────────────────────────────────────────
+# Routage nom de salon -> guilde de jeu
+# ───────────────────────────────────────────────────────────────
+# Compilé une fois par synchronisation à partir des préfixes de base de la
+# config. Les préfixes sont indexés par longueur : pour classer un nom, on ne
+# teste que name[:L] et name[-L:] pour chaque longueur L distincte, au lieu de
+# boucler sur tous les préfixes et toutes les combinaisons "<prefix>_<lang>".
+# En cas de correspondances multiples, la première guilde de la config est
+# retenue (comme l'ancienne boucle) et l'ambiguïté est signalée.
+# ───────────────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class PrefixMatch:
+    base_prefix: str
+    candidates: tuple
+
+    @property
+    def ambiguous(self) -> bool:
+        return len(self.candidates) > 1
+
+class PrefixMatcher:
+    def __init__(self, base_prefixes):
+        self.order = {}    # préfixe en minuscules -> rang dans la config
+        self.original = {} # préfixe en minuscules -> préfixe tel que configuré
+        for base_prefix in base_prefixes:
+            key = (base_prefix or "").lower()
+            if key not in self.order:
+                self.order[key] = len(self.order)
+                self.original[key] = base_prefix
+        self.lengths = sorted({len(key) for key in self.order})
+
+    @classmethod
+    def from_roles_dict(cls, roles_dict: dict) -> "PrefixMatcher":
+        return cls(roles_dict.keys())
+
+    def _result(self, keys: set):
+        if not keys:
+            return None
+        ordered = sorted(keys, key=self.order.__getitem__)
+        return PrefixMatch(
+            base_prefix=self.original[ordered[0]],
+            candidates=tuple(self.original[key] for key in ordered)
+        )
+
+    def match_base(self, name: str):
+        """
+        Guilde dont le préfixe de base commence ou termine le nom (catégories).
+        """
+        name = name.lower()
+        keys = set()
+        for length in self.lengths:
+            if length > len(name):
+                break
+            head = name[:length]
+            if head in self.order:
+                keys.add(head)
+            tail = name[len(name) - length:]
+            if tail in self.order:
+                keys.add(tail)
+        return self._result(keys)
+
+    def match_full(self, name: str, short_lang: str):
+        """
+        Guilde dont le préfixe complet "<prefix>_<lang>" commence ou termine le nom (salons).
+        """
+        name = name.lower()
+        suffix = f"_{short_lang.lower()}"
+        keys = set()
+        for length in self.lengths:
+            full_length = length + len(suffix)
+            if full_length > len(name):
+                break
+            head = name[:full_length]
+            if head.endswith(suffix) and head[:length] in self.order:
+                keys.add(head[:length])
+            tail = name[len(name) - full_length:]
+            if tail.endswith(suffix) and tail[:length] in self.order:
+                keys.add(tail[:length])
+        return self._result(keys)
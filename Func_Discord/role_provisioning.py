@@ -0,0 +1,95 @@
+# Func_Discord/role_provisioning.py
+
+import asyncio
+import functools
+
+import discord
+
+from Func_Discord.api_executor import executor, WriteJob, guild_roles_route
+from Func_Discord.guild_index import guild_index
+from Func_Discord.perm_planner import role_name_for
+
+# ───────────────────────────────────────────────────────────────
+# Provisionnement des rôles Role_<prefix>_<lang>
+# ───────────────────────────────────────────────────────────────
+# Calcule la matrice (guilde de jeu × langue) des rôles manquants à partir de
+# la config et de l'index des rôles, puis les crée en parallèle via l'exécuteur
+# partagé (respect des rate limits). Idempotent : un rôle existant ou en cours
+# de création n'est jamais recréé, une nouvelle exécution ne coûte que le calcul.
+# ───────────────────────────────────────────────────────────────
+
+_in_flight = {}  # (guild_id, role_name) -> asyncio.Future
+
+def expected_role_names(config: dict, base_prefixes: list = None) -> list:
+    """
+    Noms de tous les rôles attendus pour la config (ou pour les seuls préfixes indiqués).
+    """
+    if base_prefixes is None:
+        base_prefixes = [g.get("base_prefix") for g in config.get("guildes", {}).values()]
+    return [
+        role_name_for(base_prefix, lang_code)
+        for base_prefix in base_prefixes
+        for lang_code in config.get("languages", {})
+    ]
+
+def missing_role_names(guild: discord.Guild, config: dict, base_prefixes: list = None) -> list:
+    roles_by_name = guild_index.get(guild).roles_by_name
+    return [name for name in expected_role_names(config, base_prefixes) if name not in roles_by_name]
+
+async def provision_roles(guild: discord.Guild, config: dict, base_prefixes: list = None, on_progress=None) -> dict:
+    """
+    Crée les rôles manquants et retourne un résumé {created, existing, failed}.
+    created et failed sont des listes de noms de rôles.
+    """
+    missing = missing_role_names(guild, config, base_prefixes)
+    existing = len(expected_role_names(config, base_prefixes)) - len(missing)
+
+    waiting = []
+    to_create = []
+    loop = asyncio.get_running_loop()
+    for role_name in missing:
+        key = (guild.id, role_name)
+        future = _in_flight.get(key)
+        if future is not None:
+            waiting.append((role_name, future))
+        else:
+            _in_flight[key] = loop.create_future()
+            to_create.append(role_name)
+
+    jobs = [
+        WriteJob(route=guild_roles_route(guild), factory=functools.partial(guild.create_role, name=role_name), label=role_name,
+                 idempotent=False)
+        for role_name in to_create
+    ]
+    results = []
+    try:
+        results = await executor.run(jobs, on_progress=on_progress)
+    finally:
+        # Indexe les rôles créés puis libère les appels concurrents, même en cas d'annulation
+        created_names = set()
+        for result in results:
+            if result.ok:
+                guild_index.on_role_created(result.result)
+                created_names.add(result.label)
+        for role_name in to_create:
+            future = _in_flight.pop((guild.id, role_name))
+            if not future.done():
+                future.set_result(role_name in created_names)
+
+    created = []
+    failed = []
+    for result in results:
+        if result.ok:
+            created.append(result.label)
+        else:
+            failed.append(result.label)
+            print(f"Erreur lors de la création du rôle {result.label} : {result.error}")
+
+    # Rôles créés par un provisionnement concurrent
+    for role_name, future in waiting:
+        if await future and guild_index.role_by_name(guild, role_name) is not None:
+            existing += 1
+        else:
+            failed.append(role_name)
+
+    return {"created": created, "existing": existing, "failed": failed}
@@ -0,0 +1,158 @@
+# Func_Discord/webhook_registry.py
+
+import time
+import asyncio
+import logging
+
+import aiohttp
+import discord
+
+from Func_Metrics.metrics import registry
+
+logger = logging.getLogger("webhook_registry")
+
+# ───────────────────────────────────────────────────────────────
+# Registre des webhooks de relais (Webhook_id de la table TextChannel)
+# ───────────────────────────────────────────────────────────────
+# Chaque Webhook_id est résolu une seule fois (bot.fetch_webhook, résolutions
+# simultanées regroupées) en un webhook partiel (id + token) attaché à une
+# session HTTP unique, réutilisée pour tous les envois. Une réponse 404 à
+# l'envoi provoque une nouvelle résolution ; les webhooks d'un salon supprimé
+# ou dont les webhooks ont changé sont retirés du registre.
+# Un webhook introuvable ou sans token est mémorisé comme indisponible pendant
+# FAILURE_TTL (ou jusqu'à l'événement webhooks_update / suppression du salon)
+# pour ne pas le redemander à Discord à chaque message relayé.
+# ───────────────────────────────────────────────────────────────
+FAILURE_TTL = 300.0
+
+WEBHOOK_RESOLVES = registry.counter("tikana_webhook_resolves_total", "Résolutions de webhooks par résultat", ("result",))
+WEBHOOK_REFRESHES = registry.counter("tikana_webhook_refreshes_total", "Webhooks résolus à nouveau après un 404")
+
+class WebhookUnavailable(Exception):
+    """
+    Webhook inutilisable (supprimé, inaccessible ou sans token). fresh est False quand
+    l'échec provient du cache des échecs plutôt que d'une réponse de Discord.
+    """
+    def __init__(self, webhook_id: int, reason: str, fresh: bool = True):
+        super().__init__(f"Webhook {webhook_id} indisponible ({reason})")
+        self.webhook_id = webhook_id
+        self.reason = reason
+        self.fresh = fresh
+
+class WebhookRegistry:
+    def __init__(self, bot: discord.Client = None, failure_ttl: float = FAILURE_TTL):
+        self.bot = bot
+        self.failure_ttl = failure_ttl
+        self._session = None
+        self._webhooks = {}    # webhook_id -> discord.Webhook
+        self._channels = {}    # webhook_id -> channel_id
+        self._failures = {}    # webhook_id -> (raison, expire à)
+        self._resolving = {}   # webhook_id -> Task (résolution en cours)
+
+    def attach(self, bot: discord.Client):
+        self.bot = bot
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Créée paresseusement pour être liée à la boucle asyncio du bot
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    def __len__(self) -> int:
+        return len(self._webhooks)
+
+    def _fail(self, webhook_id: int, reason: str) -> WebhookUnavailable:
+        WEBHOOK_RESOLVES.inc(result=reason)
+        self._failures[webhook_id] = (reason, time.monotonic() + self.failure_ttl)
+        return WebhookUnavailable(webhook_id, reason)
+
+    async def _resolve(self, webhook_id: int) -> discord.Webhook:
+        try:
+            fetched = await self.bot.fetch_webhook(webhook_id)
+        except discord.NotFound:
+            raise self._fail(webhook_id, "not_found")
+        except discord.Forbidden:
+            raise self._fail(webhook_id, "forbidden")
+        if fetched.token is None:
+            # Webhook non créé par un utilisateur ou une application (ex. salon suivi) : pas d'envoi par token
+            raise self._fail(webhook_id, "no_token")
+        WEBHOOK_RESOLVES.inc(result="ok")
+        self._channels[webhook_id] = fetched.channel_id
+        return discord.Webhook.partial(fetched.id, fetched.token, session=self._get_session())
+
+    def _on_resolved(self, webhook_id: int, task: asyncio.Task):
+        self._resolving.pop(webhook_id, None)
+        if task.cancelled():
+            return
+        error = task.exception()  # marque l'exception comme lue même si personne n'attend plus
+        if error is not None:
+            if not isinstance(error, WebhookUnavailable):
+                # Erreur transitoire (réseau, 5xx) : non mémorisée
+                WEBHOOK_RESOLVES.inc(result="failed")
+            return
+        self._webhooks[webhook_id] = task.result()
+
+    async def get(self, webhook_id: int, channel_id: int = None) -> discord.Webhook:
+        """
+        Retourne le webhook résolu ; lève WebhookUnavailable s'il est inutilisable.
+        channel_id (salon du webhook connu de l'appelant) permet d'oublier un échec
+        mémorisé dès l'événement webhooks_update de ce salon.
+        """
+        webhook = self._webhooks.get(webhook_id)
+        if webhook is not None:
+            return webhook
+        if channel_id is not None:
+            self._channels.setdefault(webhook_id, channel_id)
+        failure = self._failures.get(webhook_id)
+        if failure is not None:
+            if time.monotonic() < failure[1]:
+                raise WebhookUnavailable(webhook_id, failure[0], fresh=False)
+            del self._failures[webhook_id]
+        # La résolution tourne dans sa propre tâche : l'annulation d'un appelant
+        # ne la fait pas échouer pour les autres appelants
+        task = self._resolving.get(webhook_id)
+        if task is None:
+            task = asyncio.create_task(self._resolve(webhook_id))
+            self._resolving[webhook_id] = task
+            task.add_done_callback(lambda done: self._on_resolved(webhook_id, done))
+        return await asyncio.shield(task)
+
+    async def send(self, webhook_id: int, channel_id: int, *args, **kwargs):
+        """
+        Envoie via le webhook du salon channel_id ; après un 404 (webhook recréé ou token changé),
+        le webhook est résolu à nouveau et l'envoi retenté une fois. Un webhook réellement
+        supprimé lève WebhookUnavailable.
+        """
+        webhook = await self.get(webhook_id, channel_id)
+        try:
+            return await webhook.send(*args, **kwargs)
+        except discord.NotFound:
+            self.evict(webhook_id)
+            WEBHOOK_REFRESHES.inc()
+            webhook = await self.get(webhook_id, channel_id)
+            return await webhook.send(*args, **kwargs)
+
+    def evict(self, webhook_id: int):
+        self._webhooks.pop(webhook_id, None)
+        self._channels.pop(webhook_id, None)
+        self._failures.pop(webhook_id, None)
+
+    def evict_channel(self, channel_id: int):
+        """
+        Retire les webhooks d'un salon (salon supprimé ou webhooks modifiés), échecs mémorisés compris.
+        """
+        for webhook_id in [webhook_id for webhook_id, owner in self._channels.items() if owner == channel_id]:
+            self.evict(webhook_id)
+
+    async def close(self):
+        self._webhooks.clear()
+        self._channels.clear()
+        self._failures.clear()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+# Registre partagé par le relais de messages
+webhook_registry = WebhookRegistry()
+
+registry.gauge("tikana_webhook_registry_size", "Webhooks résolus en cache", callback=lambda: len(webhook_registry))
@@ -0,0 +1,43 @@
+# Func_Metrics/http_endpoint.py
+
+import logging
+
+from aiohttp import web
+
+from Func_Metrics.metrics import registry
+
+logger = logging.getLogger("metrics")
+
+# ───────────────────────────────────────────────────────────────
+# Endpoint HTTP local : GET /metrics (format texte Prometheus)
+# ───────────────────────────────────────────────────────────────
+# Écoute sur 127.0.0.1 par défaut : à exposer via un scraper local ou un tunnel,
+# jamais directement sur Internet.
+# ───────────────────────────────────────────────────────────────
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+_runner = None
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(body=registry.render().encode("utf-8"), headers={"Content-Type": f"{CONTENT_TYPE}; charset=utf-8"})
+
+async def start_metrics_server(host: str = "127.0.0.1", port: int = 9108):
+    """
+    Démarre l'endpoint sur la boucle asyncio du bot (aiohttp est déjà une dépendance de discord.py).
+    """
+    global _runner
+    if _runner is not None:
+        return
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    _runner = runner
+    logger.info(f"Endpoint de métriques disponible sur http://{host}:{port}/metrics")
+
+async def stop_metrics_server():
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
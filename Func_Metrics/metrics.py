@@ -0,0 +1,223 @@
+# Func_Metrics/metrics.py
+
+import time
+import bisect
+import logging
+import functools
+from contextlib import contextmanager
+
+logger = logging.getLogger("metrics")
+
+# ───────────────────────────────────────────────────────────────
+# Métriques locales au processus (format texte Prometheus)
+# ───────────────────────────────────────────────────────────────
+# - Counter : valeur croissante par combinaison de labels ;
+# - Gauge : valeur fixée, ou lue à l'export via une fonction (ex. pool BDD) ;
+# - Histogram : seaux cumulés + somme + nombre d'observations.
+# Tout s'exécute sur la boucle asyncio du bot : pas de verrou nécessaire.
+# ───────────────────────────────────────────────────────────────
+
+# Seaux de latence (secondes), de la requête SQL rapide à l'étape de sync longue
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+def _label_key(label_names: tuple, labels: dict) -> tuple:
+    if set(labels) != set(label_names):
+        raise ValueError(f"Labels attendus : {', '.join(label_names)}")
+    return tuple(str(labels[name]) for name in label_names)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(label_names: tuple, key: tuple, extra: dict = None) -> str:
+    pairs = list(zip(label_names, key)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str, label_names: tuple = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, label_names: tuple = ()):
+        super().__init__(name, description, label_names)
+        self._values = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(self.label_names, labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.label_names, labels), 0.0)
+
+    def render(self) -> list:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {value}"
+            for key, value in sorted(self._values.items())
+        ]
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, label_names: tuple = (), callback=None):
+        super().__init__(name, description, label_names)
+        self._values = {}
+        self._callback = callback  # callable sans argument -> valeur, ou {tuple de labels: valeur}
+
+    def set(self, value: float, **labels):
+        self._values[_label_key(self.label_names, labels)] = value
+
+    def render(self) -> list:
+        values = dict(self._values)
+        if self._callback is not None:
+            try:
+                current = self._callback()
+            except Exception as e:
+                logger.warning(f"Erreur lors de la lecture de la jauge {self.name} : {e}")
+                current = None
+            if isinstance(current, dict):
+                values.update(current)
+            elif current is not None:
+                values[()] = current
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {value}"
+            for key, value in sorted(values.items())
+        ]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [comptes par seau, somme, nombre]
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.label_names, labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def snapshot(self, **labels) -> dict:
+        series = self._series.get(_label_key(self.label_names, labels))
+        if series is None:
+            return {"count": 0, "sum": 0.0}
+        return {"count": series[2], "sum": series[1]}
+
+    def render(self) -> list:
+        lines = self.header()
+        for key, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, {'le': bound})} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, {'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            # Réimport d'un module : on réutilise la métrique existante
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, description: str, label_names: tuple = ()) -> Counter:
+        return self._register(Counter(name, description, label_names))
+
+    def gauge(self, name: str, description: str, label_names: tuple = (), callback=None) -> Gauge:
+        return self._register(Gauge(name, description, label_names, callback))
+
+    def histogram(self, name: str, description: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, description, label_names, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+# Registre partagé, exporté par Func_Metrics.http_endpoint
+registry = Registry()
+
+# ───────────────────────────────────────────────────────────────
+# Journalisation structurée
+# ───────────────────────────────────────────────────────────────
+def log_event(event: str, level: int = logging.INFO, **fields):
+    """
+    Écrit une ligne "event=... clé=valeur ..." exploitable par grep / un collecteur de logs.
+    """
+    parts = [f"event={event}"]
+    for key, value in fields.items():
+        text = str(value)
+        parts.append(f'{key}="{text}"' if " " in text or not text else f"{key}={text}")
+    logger.log(level, " ".join(parts))
+
+# ───────────────────────────────────────────────────────────────
+# Spans de timing et requêtes SQL chronométrées
+# ───────────────────────────────────────────────────────────────
+STAGE_SECONDS = registry.histogram(
+    "tikana_stage_duration_seconds", "Durée des étapes de synchronisation / rollback", ("operation", "stage")
+)
+QUERY_SECONDS = registry.histogram(
+    "tikana_db_query_duration_seconds", "Latence des requêtes Func_SQL (acquisition de connexion comprise)", ("query",)
+)
+QUERY_ERRORS = registry.counter(
+    "tikana_db_query_errors_total", "Requêtes Func_SQL terminées par une exception", ("query",)
+)
+
+@contextmanager
+def span(operation: str, stage: str, **fields):
+    """
+    with span("sync", "backup", guild=guild.id): ...
+    Chronomètre le bloc, alimente l'histogramme des étapes et journalise la durée.
+    """
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, operation=operation, stage=stage)
+        log_event(f"{operation}.{stage}", duration_ms=f"{elapsed * 1000:.1f}", status=status, **fields)
+
+def timed_query(func):
+    """
+    Décorateur des fonctions de requête Func_SQL : histogramme de latence par nom de fonction.
+    """
+    name = func.__name__.lstrip("_")
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            QUERY_ERRORS.inc(query=name)
+            raise
+        finally:
+            QUERY_SECONDS.observe(time.perf_counter() - start, query=name)
+    return wrapper
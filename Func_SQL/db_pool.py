@@ -3,31 +3,171 @@
 import aiomysql
 import asyncio
 import logging
+import os
+import time
+from contextlib import asynccontextmanager
 # ==> on va créer un nouveau module db_config_loader pour charger la config JSON
 from Func_SQL.db_config_loader import load_db_config  # (Chemin à adapter si besoin)
+from Func_Metrics.metrics import registry
 
 pool = None
+_pool_lock = None
 logger = logging.getLogger("db_pool")  # Au lieu d'importer LOGGER depuis config
 
+# ───────────────────────────────────────────────────────────────
+# Dimensionnement du pool
+# ───────────────────────────────────────────────────────────────
+# Valeurs par défaut, surchargeables par les clés optionnelles
+# "pool_minsize", "pool_maxsize" et "pool_acquire_timeout" du fichier de
+# paramètres BDD (Conf_files/*_db_params.json).
+# En déploiement multi-processus (launcher.py), la variable d'environnement
+# bot_process_count répartit ces tailles entre les processus.
+# ───────────────────────────────────────────────────────────────
+DEFAULT_POOL_MINSIZE = 10
+DEFAULT_POOL_MAXSIZE = 100
+DEFAULT_ACQUIRE_TIMEOUT = 10.0
+
+pool_settings = {
+    "minsize": DEFAULT_POOL_MINSIZE,
+    "maxsize": DEFAULT_POOL_MAXSIZE,
+    "acquire_timeout": DEFAULT_ACQUIRE_TIMEOUT,
+}
+
+# Compteurs d'instrumentation du pool
+_metrics = {
+    "acquires": 0,
+    "acquire_timeouts": 0,
+    "wait_time_total": 0.0,
+    "wait_time_max": 0.0,
+}
+
+ACQUIRE_WAIT_SECONDS = registry.histogram(
+    "tikana_db_pool_acquire_wait_seconds", "Temps d'attente pour obtenir une connexion du pool"
+)
+
 async def init_db_pool():
     global pool
     db_config = load_db_config()  # on récupère la config depuis le nouveau module
     # db_config['db'] = db_config.pop('database', None) # si nécessaire
+    pool_settings["minsize"] = int(db_config.pop("pool_minsize", DEFAULT_POOL_MINSIZE))
+    pool_settings["maxsize"] = int(db_config.pop("pool_maxsize", DEFAULT_POOL_MAXSIZE))
+    pool_settings["acquire_timeout"] = float(db_config.pop("pool_acquire_timeout", DEFAULT_ACQUIRE_TIMEOUT))
+    process_count = max(1, int(os.getenv("bot_process_count", "1")))
+    if process_count > 1:
+        pool_settings["minsize"] = max(1, pool_settings["minsize"] // process_count)
+        pool_settings["maxsize"] = max(pool_settings["minsize"], pool_settings["maxsize"] // process_count)
     try:
         pool = await aiomysql.create_pool(
             **db_config,
             autocommit=True,
-            minsize=10,
-            maxsize=100,
+            minsize=pool_settings["minsize"],
+            maxsize=pool_settings["maxsize"],
             charset="utf8mb4"
         )
-        logger.info("🔍 Pool de connexions initialisé ✅")
+        logger.info(f"🔍 Pool de connexions initialisé ✅ (min={pool_settings['minsize']}, max={pool_settings['maxsize']})")
     except Exception as e:
         logger.error(f"🔍 Erreur lors de l'initialisation du pool : {e}")
         raise
 
 async def get_pool():
-    global pool
+    global pool, _pool_lock
     if pool is None:
-        await init_db_pool()
+        if _pool_lock is None:
+            _pool_lock = asyncio.Lock()
+        async with _pool_lock:
+            if pool is None:
+                await init_db_pool()
     return pool
+
+async def warm_up_pool():
+    """
+    Initialise le pool au démarrage du bot et vérifie une connexion,
+    pour que la première commande ne paie pas l'établissement des connexions.
+    """
+    async with db_connection() as conn:
+        await conn.ping()
+    logger.info(f"🔍 Pool préchauffé : {pool_metrics()}")
+
+async def close_db_pool():
+    global pool
+    if pool is not None:
+        pool.close()
+        await pool.wait_closed()
+        pool = None
+        logger.info("🔍 Pool de connexions fermé")
+
+# ───────────────────────────────────────────────────────────────
+# Acquisition / libération des connexions
+# ───────────────────────────────────────────────────────────────
+async def acquire_connection(timeout: float = None) -> aiomysql.Connection:
+    """
+    Acquiert une connexion du pool en mesurant le temps d'attente.
+    Lève asyncio.TimeoutError si aucune connexion n'est disponible à temps.
+    """
+    current_pool = await get_pool()
+    timeout = pool_settings["acquire_timeout"] if timeout is None else timeout
+    start = time.perf_counter()
+    try:
+        conn = await asyncio.wait_for(current_pool.acquire(), timeout)
+    except asyncio.TimeoutError:
+        _metrics["acquire_timeouts"] += 1
+        logger.error(f"🔍 Délai d'acquisition dépassé ({timeout}s) : {pool_metrics()}")
+        raise
+    waited = time.perf_counter() - start
+    _metrics["acquires"] += 1
+    _metrics["wait_time_total"] += waited
+    _metrics["wait_time_max"] = max(_metrics["wait_time_max"], waited)
+    ACQUIRE_WAIT_SECONDS.observe(waited)
+    return conn
+
+async def release_connection(conn: aiomysql.Connection) -> None:
+    """
+    Rend la connexion au pool (au lieu de la fermer). pool.release retourne un future
+    (réveil des tâches en attente d'une connexion) : il est attendu pour ne pas perdre ses erreurs.
+    """
+    if pool is not None:
+        await pool.release(conn)
+    else:
+        conn.close()
+
+@asynccontextmanager
+async def db_connection(timeout: float = None):
+    """
+    Gestionnaire de contexte : async with db_connection() as conn: ...
+    """
+    conn = await acquire_connection(timeout)
+    try:
+        yield conn
+    finally:
+        await release_connection(conn)
+
+# ───────────────────────────────────────────────────────────────
+# Instrumentation
+# ───────────────────────────────────────────────────────────────
+def pool_metrics() -> dict:
+    """
+    Retourne l'état courant du pool : connexions utilisées / libres, temps d'attente
+    et nombre de délais d'acquisition dépassés.
+    """
+    size = pool.size if pool is not None else 0
+    idle = pool.freesize if pool is not None else 0
+    acquires = _metrics["acquires"]
+    return {
+        "size": size,
+        "in_use": size - idle,
+        "idle": idle,
+        "minsize": pool_settings["minsize"],
+        "maxsize": pool_settings["maxsize"],
+        "acquires": acquires,
+        "acquire_timeouts": _metrics["acquire_timeouts"],
+        "wait_time_avg": _metrics["wait_time_total"] / acquires if acquires else 0.0,
+        "wait_time_max": _metrics["wait_time_max"],
+    }
+
+# Jauges exportées sur l'endpoint /metrics (lues à chaque export)
+registry.gauge(
+    "tikana_db_pool_connections", "Connexions du pool par état", ("state",),
+    callback=lambda: {("in_use",): pool_metrics()["in_use"], ("idle",): pool_metrics()["idle"]}
+)
+registry.gauge("tikana_db_pool_maxsize", "Taille maximale du pool", callback=lambda: pool_settings["maxsize"])
+registry.gauge("tikana_db_pool_acquire_timeouts", "Délais d'acquisition dépassés depuis le démarrage", callback=lambda: _metrics["acquire_timeouts"])
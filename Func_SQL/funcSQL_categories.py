@@ -1,29 +1,114 @@
-import aiomysql
 import asyncio
-from Func_SQL.db_pool import get_pool  # Assurez-vous que cette fonction est correctement définie
+from Func_Metrics.metrics import registry, timed_query
+from Func_SQL.db_pool import db_connection
 
 # ───────────────────────────────────────────────────────────────
-# Table CategoryAllocations (à créer dans votre DB, par exemple via un script SQL)
+# Table CategoryAllocations
 # ───────────────────────────────────────────────────────────────
-# Exemple de création :
-#
-# CREATE TABLE IF NOT EXISTS CategoryAllocations (
-#     category_id BIGINT PRIMARY KEY,
-#     guild_id BIGINT NOT NULL,
-#     category_name VARCHAR(255) NOT NULL,
-#     allocated_game_guild_id INT NOT NULL,
-#     allocated_game_guild VARCHAR(50) NOT NULL
-# );
-#
+# Schéma et index (guild_id, category_id) : migration 3 de
+# Func_SQL/funcSQL_migrations.py, appliquée au démarrage du bot.
 # ───────────────────────────────────────────────────────────────
 
+# ───────────────────────────────────────────────────────────────
+# Cache des allocations par serveur
+# ───────────────────────────────────────────────────────────────
+# Les allocations d'un serveur sont chargées en une seule requête puis servies
+# depuis la mémoire. allocate_category met le cache à jour en place.
+# guild_id -> {category_id: (category_id, category_name, allocated_game_guild_id, allocated_game_guild)}
+# ───────────────────────────────────────────────────────────────
+_allocation_cache = {}
+_allocation_locks = {}
+_cache_stats = {"hits": 0, "misses": 0}
+
+# Nombre maximum de serveurs par requête de préchauffage
+PRELOAD_CHUNK_SIZE = 500
+
+@timed_query
+async def _fetch_guild_allocations(guild_id: int) -> dict:
+    async with db_connection() as conn:
+        async with conn.cursor() as cursor:
+            query = """
+            SELECT category_id, category_name, allocated_game_guild_id, allocated_game_guild 
+            FROM CategoryAllocations 
+            WHERE guild_id = %s
+            """
+            await cursor.execute(query, (guild_id,))
+            results = await cursor.fetchall()
+    return {int(row[0]): tuple(row) for row in results}
+
+async def _load_guild_allocations(guild_id: int) -> dict:
+    """
+    Retourne les allocations du serveur depuis le cache, en les chargeant en bloc si besoin.
+    """
+    allocations = _allocation_cache.get(guild_id)
+    if allocations is not None:
+        _cache_stats["hits"] += 1
+        return allocations
+    lock = _allocation_locks.setdefault(guild_id, asyncio.Lock())
+    async with lock:
+        allocations = _allocation_cache.get(guild_id)
+        if allocations is not None:
+            _cache_stats["hits"] += 1
+            return allocations
+        _cache_stats["misses"] += 1
+        allocations = await _fetch_guild_allocations(guild_id)
+        _allocation_cache[guild_id] = allocations
+        return allocations
+
+@timed_query
+async def preload_category_allocations(guild_ids: list) -> int:
+    """
+    Charge en cache les allocations de plusieurs serveurs en une requête par lot (préchauffage au démarrage).
+    Retourne le nombre de serveurs chargés.
+    """
+    guild_ids = [guild_id for guild_id in dict.fromkeys(guild_ids) if guild_id not in _allocation_cache]
+    for start in range(0, len(guild_ids), PRELOAD_CHUNK_SIZE):
+        chunk = guild_ids[start:start + PRELOAD_CHUNK_SIZE]
+        loaded = {guild_id: {} for guild_id in chunk}
+        placeholders = ", ".join(["%s"] * len(chunk))
+        async with db_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(f"""
+                    SELECT category_id, category_name, allocated_game_guild_id, allocated_game_guild, guild_id
+                    FROM CategoryAllocations
+                    WHERE guild_id IN ({placeholders})
+                """, tuple(chunk))
+                for row in await cursor.fetchall():
+                    loaded[int(row[4])][int(row[0])] = tuple(row[:4])
+        for guild_id, allocations in loaded.items():
+            # Un chargement concurrent (commande) a pu remplir le cache entre-temps
+            _allocation_cache.setdefault(guild_id, allocations)
+    return len(guild_ids)
+
+def invalidate_category_allocations(guild_id: int = None):
+    """
+    Invalide le cache d'un serveur, ou de tous les serveurs si guild_id est None.
+    """
+    if guild_id is None:
+        _allocation_cache.clear()
+    else:
+        _allocation_cache.pop(guild_id, None)
+
+def allocation_cache_stats() -> dict:
+    """
+    Retourne les compteurs du cache : hits, misses et nombre de serveurs chargés.
+    """
+    return {**_cache_stats, "guilds": len(_allocation_cache)}
+
+# Jauges exportées sur l'endpoint /metrics (lues à chaque export)
+registry.gauge(
+    "tikana_allocation_cache_lookups", "Lectures du cache des allocations depuis le démarrage", ("result",),
+    callback=lambda: {("hit",): allocation_cache_stats()["hits"], ("miss",): allocation_cache_stats()["misses"]}
+)
+registry.gauge("tikana_allocation_cache_guilds", "Serveurs chargés dans le cache des allocations", callback=lambda: allocation_cache_stats()["guilds"])
+
+@timed_query
 async def allocate_category(category_id: int, guild_id: int, category_name: str, allocated_game_guild_id: int, allocated_game_guild: str):
     """
     Insère ou met à jour l'allocation d'une catégorie à une guilde de jeu.
     Utilise un alias pour les valeurs insérées afin d'éviter l'utilisation de VALUES() qui est dépréciée.
     """
-    pool = await get_pool()
-    async with pool.acquire() as conn:
+    async with db_connection() as conn:
         async with conn.cursor() as cursor:
             query = """
             INSERT INTO CategoryAllocations (category_id, guild_id, category_name, allocated_game_guild_id, allocated_game_guild)
@@ -35,23 +120,20 @@ async def allocate_category(category_id: int, guild_id: int, category_name: str,
             """
             await cursor.execute(query, (category_id, guild_id, category_name, allocated_game_guild_id, allocated_game_guild))
             await conn.commit()
+    allocations = _allocation_cache.get(guild_id)
+    if allocations is not None:
+        allocations[category_id] = (category_id, category_name, allocated_game_guild_id, allocated_game_guild)
 
 async def fetch_category_allocation(category_id: int, guild_id: int):
     """
-    Récupère l'allocation d'une catégorie (si existante).
-    Retourne None si aucune allocation n'est trouvée.
+    Récupère l'allocation d'une catégorie (si existante) depuis le cache du serveur.
+    Retourne un tuple (allocated_game_guild_id, allocated_game_guild) ou None si aucune allocation n'est trouvée.
     """
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        async with conn.cursor() as cursor:
-            query = """
-            SELECT allocated_game_guild_id, allocated_game_guild 
-            FROM CategoryAllocations 
-            WHERE category_id = %s AND guild_id = %s
-            """
-            await cursor.execute(query, (category_id, guild_id))
-            result = await cursor.fetchone()
-            return result
+    allocations = await _load_guild_allocations(guild_id)
+    allocation = allocations.get(category_id)
+    if allocation is None:
+        return None
+    return allocation[2], allocation[3]
 
 async def fetch_all_category_allocations(guild_id: int):
     """
@@ -59,14 +141,5 @@ async def fetch_all_category_allocations(guild_id: int):
     Retourne une liste de tuples :
     (category_id, category_name, allocated_game_guild_id, allocated_game_guild)
     """
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        async with conn.cursor() as cursor:
-            query = """
-            SELECT category_id, category_name, allocated_game_guild_id, allocated_game_guild 
-            FROM CategoryAllocations 
-            WHERE guild_id = %s
-            """
-            await cursor.execute(query, (guild_id,))
-            results = await cursor.fetchall()
-            return results
+    allocations = await _load_guild_allocations(guild_id)
+    return list(allocations.values())
@@ -0,0 +1,176 @@
+# Func_SQL/funcSQL_guilds.py
+
+import os
+import copy
+import time
+import asyncio
+from collections import OrderedDict
+
+from Func_Config.server_config import BASE_DIR, get_server_config_path, load_server_config
+from Func_Metrics.metrics import registry, timed_query
+from Func_SQL.db_pool import db_connection, close_db_pool
+from Func_SQL.funcSQL_migrations import run_migrations
+
+# ───────────────────────────────────────────────────────────────
+# Tables GameGuilds / ServerLanguages (remplacent Guilds/<server_id>/config.json)
+# ───────────────────────────────────────────────────────────────
+# Schéma : migration 1 de Func_SQL/funcSQL_migrations.py
+
+# ───────────────────────────────────────────────────────────────
+# Cache en lecture (read-through) par serveur
+# ───────────────────────────────────────────────────────────────
+# Les écritures de ce processus mettent le cache à jour directement. La durée
+# de vie limite le décalage avec les écritures d'autres processus du bot.
+# ───────────────────────────────────────────────────────────────
+GUILD_CONFIG_CACHE_MAX_SIZE = 1000
+GUILD_CONFIG_CACHE_TTL = 30.0
+
+_config_cache = OrderedDict()  # server_id -> [config, loaded_at]
+_cache_stats = {"hits": 0, "misses": 0}
+
+def _store_in_cache(server_id: int, config: dict):
+    _config_cache[server_id] = [config, time.monotonic()]
+    _config_cache.move_to_end(server_id)
+    while len(_config_cache) > GUILD_CONFIG_CACHE_MAX_SIZE:
+        _config_cache.popitem(last=False)
+
+@timed_query
+async def _fetch_guild_config(server_id: int) -> dict:
+    config = {"guildes": {}, "languages": {}}
+    async with db_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute("""
+                SELECT game_guild_id, name, base_prefix
+                FROM GameGuilds
+                WHERE server_id = %s
+                ORDER BY game_guild_id
+            """, (server_id,))
+            for game_guild_id, name, base_prefix in await cursor.fetchall():
+                config["guildes"][str(game_guild_id)] = {"id": int(game_guild_id), "name": name, "base_prefix": base_prefix}
+            await cursor.execute("""
+                SELECT lang_code, lang_name
+                FROM ServerLanguages
+                WHERE server_id = %s
+                ORDER BY position, lang_code
+            """, (server_id,))
+            for lang_code, lang_name in await cursor.fetchall():
+                config["languages"][lang_code] = lang_name
+    return config
+
+async def load_guild_config(server_id: int, readonly: bool = False) -> dict:
+    """
+    Retourne la config {"guildes": {...}, "languages": {...}} d'un serveur (même format que config.json).
+    Avec readonly=True, l'objet en cache est retourné tel quel et ne doit pas être modifié.
+    """
+    entry = _config_cache.get(server_id)
+    if entry is not None and time.monotonic() - entry[1] < GUILD_CONFIG_CACHE_TTL:
+        _cache_stats["hits"] += 1
+        _config_cache.move_to_end(server_id)
+        config = entry[0]
+    else:
+        _cache_stats["misses"] += 1
+        config = await _fetch_guild_config(server_id)
+        _store_in_cache(server_id, config)
+    return config if readonly else copy.deepcopy(config)
+
+def invalidate_guild_config(server_id: int = None):
+    if server_id is None:
+        _config_cache.clear()
+    else:
+        _config_cache.pop(server_id, None)
+
+def guild_config_cache_stats() -> dict:
+    return {**_cache_stats, "guilds": len(_config_cache)}
+
+# Jauges exportées sur l'endpoint /metrics (lues à chaque export)
+registry.gauge(
+    "tikana_guild_config_cache_lookups", "Lectures du cache des configs de serveur depuis le démarrage", ("result",),
+    callback=lambda: {("hit",): guild_config_cache_stats()["hits"], ("miss",): guild_config_cache_stats()["misses"]}
+)
+registry.gauge("tikana_guild_config_cache_guilds", "Serveurs chargés dans le cache des configs", callback=lambda: guild_config_cache_stats()["guilds"])
+
+# ───────────────────────────────────────────────────────────────
+# Écritures
+# ───────────────────────────────────────────────────────────────
+@timed_query
+async def add_game_guild(server_id: int, game_guild_id: int, name: str, base_prefix: str):
+    """
+    Ajoute une guilde de jeu au serveur (lève une IntegrityError si l'ID ou le préfixe existe déjà).
+    """
+    async with db_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute("""
+                INSERT INTO GameGuilds (server_id, game_guild_id, name, base_prefix)
+                VALUES (%s, %s, %s, %s)
+            """, (server_id, game_guild_id, name, base_prefix))
+            await conn.commit()
+    entry = _config_cache.get(server_id)
+    if entry is not None:
+        entry[0]["guildes"][str(game_guild_id)] = {"id": game_guild_id, "name": name, "base_prefix": base_prefix}
+
+@timed_query
+async def add_languages(server_id: int, languages: dict):
+    """
+    Ajoute des langues {code: nom} au serveur ; les langues déjà présentes sont ignorées.
+    """
+    if not languages:
+        return
+    async with db_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute("SELECT COALESCE(MAX(position), -1) FROM ServerLanguages WHERE server_id = %s", (server_id,))
+            (position,) = await cursor.fetchone()
+            rows = [
+                (server_id, lang_code, lang_name, int(position) + 1 + i)
+                for i, (lang_code, lang_name) in enumerate(languages.items())
+            ]
+            await cursor.executemany("""
+                INSERT IGNORE INTO ServerLanguages (server_id, lang_code, lang_name, position)
+                VALUES (%s, %s, %s, %s)
+            """, rows)
+            await conn.commit()
+    entry = _config_cache.get(server_id)
+    if entry is not None:
+        for lang_code, lang_name in languages.items():
+            entry[0]["languages"].setdefault(lang_code, lang_name)
+
+# ───────────────────────────────────────────────────────────────
+# Import unique des anciens fichiers Guilds/<server_id>/config.json
+# ───────────────────────────────────────────────────────────────
+async def import_guild_configs_from_json() -> dict:
+    """
+    Importe toutes les configs JSON existantes. Idempotent : les lignes déjà présentes sont conservées.
+    Retourne {server_id: (nombre de guildes, nombre de langues)}. Le schéma doit être à jour (run_migrations).
+    """
+    imported = {}
+    for entry in sorted(os.listdir(BASE_DIR)):
+        if not entry.isdigit() or not os.path.exists(get_server_config_path(int(entry))):
+            continue
+        server_id = int(entry)
+        config = load_server_config(server_id)
+        async with db_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.executemany("""
+                    INSERT IGNORE INTO GameGuilds (server_id, game_guild_id, name, base_prefix)
+                    VALUES (%s, %s, %s, %s)
+                """, [
+                    (server_id, int(gg_id), gg.get("name", ""), gg.get("base_prefix", ""))
+                    for gg_id, gg in config["guildes"].items()
+                ])
+                await conn.commit()
+        await add_languages(server_id, config["languages"])
+        invalidate_guild_config(server_id)
+        imported[server_id] = (len(config["guildes"]), len(config["languages"]))
+    return imported
+
+async def _main():
+    try:
+        await run_migrations()
+        imported = await import_guild_configs_from_json()
+    finally:
+        await close_db_pool()
+    for server_id, (nb_guilds, nb_languages) in imported.items():
+        print(f"Serveur {server_id} : {nb_guilds} guildes, {nb_languages} langues importées")
+
+if __name__ == "__main__":
+    # python -m Func_SQL.funcSQL_guilds : import des configs JSON existantes
+    asyncio.run(_main())
@@ -0,0 +1,114 @@
+# Func_SQL/funcSQL_jobs.py
+
+import json
+
+from Func_Metrics.metrics import timed_query
+from Func_SQL.db_pool import db_connection
+
+# ───────────────────────────────────────────────────────────────
+# Table PermissionJobs : jobs de synchronisation / rollback en arrière-plan
+# ───────────────────────────────────────────────────────────────
+# status : pending -> running -> done | failed | cancelled
+# checkpoint : id du dernier salon traité (les salons sont traités par id croissant)
+# ───────────────────────────────────────────────────────────────
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+ACTIVE_STATUSES = (JOB_PENDING, JOB_RUNNING)
+
+# Schéma : migration 2 de Func_SQL/funcSQL_migrations.py
+
+JOB_COLUMNS = [
+    "job_id", "guild_id", "kind", "status", "params", "total", "done", "changed", "failed",
+    "checkpoint", "progress_channel_id", "progress_message_id", "error", "created_at", "updated_at"
+]
+
+def _row_to_job(row) -> dict:
+    if row is None:
+        return None
+    job = dict(zip(JOB_COLUMNS, row))
+    job["params"] = json.loads(job["params"]) if job["params"] else {}
+    return job
+
+@timed_query
+async def create_job(guild_id: int, kind: str, params: dict = None, progress_channel_id: int = None) -> int:
+    """
+    Crée un job en attente et retourne son identifiant.
+    """
+    async with db_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute("""
+                INSERT INTO PermissionJobs (guild_id, kind, status, params, progress_channel_id)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (guild_id, kind, JOB_PENDING, json.dumps(params or {}), progress_channel_id))
+            await conn.commit()
+            return cursor.lastrowid
+
+@timed_query
+async def fetch_job(job_id: int) -> dict:
+    async with db_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(f"""
+                SELECT {", ".join(JOB_COLUMNS)}
+                FROM PermissionJobs
+                WHERE job_id = %s
+            """, (job_id,))
+            return _row_to_job(await cursor.fetchone())
+
+@timed_query
+async def fetch_guild_jobs(guild_id: int, limit: int = 10) -> list:
+    """
+    Derniers jobs d'un serveur, du plus récent au plus ancien.
+    """
+    async with db_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(f"""
+                SELECT {", ".join(JOB_COLUMNS)}
+                FROM PermissionJobs
+                WHERE guild_id = %s
+                ORDER BY job_id DESC
+                LIMIT %s
+            """, (guild_id, limit))
+            return [_row_to_job(row) for row in await cursor.fetchall()]
+
+@timed_query
+async def fetch_active_jobs(guild_ids: list) -> list:
+    """
+    Jobs en attente ou interrompus (pending / running) des serveurs indiqués, à reprendre.
+    """
+    guild_ids = list(guild_ids)
+    if not guild_ids:
+        return []
+    placeholders = ", ".join(["%s"] * len(guild_ids))
+    async with db_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(f"""
+                SELECT {", ".join(JOB_COLUMNS)}
+                FROM PermissionJobs
+                WHERE status IN (%s, %s) AND guild_id IN ({placeholders})
+                ORDER BY job_id
+            """, (*ACTIVE_STATUSES, *guild_ids))
+            return [_row_to_job(row) for row in await cursor.fetchall()]
+
+@timed_query
+async def update_job(job_id: int, **fields):
+    """
+    Met à jour les colonnes indiquées (status, params, total, done, changed, failed, checkpoint,
+    progress_message_id, error).
+    """
+    if "params" in fields:
+        fields["params"] = json.dumps(fields["params"])
+    unknown = set(fields) - set(JOB_COLUMNS)
+    if unknown:
+        raise ValueError(f"Colonnes inconnues : {', '.join(sorted(unknown))}")
+    assignments = ", ".join(f"{column} = %s" for column in fields)
+    async with db_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                f"UPDATE PermissionJobs SET {assignments} WHERE job_id = %s",
+                (*fields.values(), job_id)
+            )
+            await conn.commit()
@@ -0,0 +1,187 @@
+# Func_SQL/funcSQL_migrations.py
+
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from Func_Metrics.metrics import timed_query
+from Func_SQL.db_pool import db_connection, close_db_pool
+
+logger = logging.getLogger("migrations")
+
+# ───────────────────────────────────────────────────────────────
+# Migrations versionnées du schéma
+# ───────────────────────────────────────────────────────────────
+# Chaque migration (version croissante) est appliquée une seule fois et
+# enregistrée dans schema_migrations. Les DDL MySQL sont validés implicitement
+# (pas de transaction) : les étapes sont donc idempotentes (IF NOT EXISTS,
+# index ajoutés seulement s'ils manquent) pour qu'une migration interrompue
+# puisse être rejouée. Un verrou nommé (GET_LOCK) évite que plusieurs
+# processus du bot migrent en même temps au démarrage.
+# Ne jamais modifier une migration publiée : en ajouter une nouvelle.
+# ───────────────────────────────────────────────────────────────
+MIGRATION_LOCK = "tikana_schema_migrations"
+MIGRATION_LOCK_TIMEOUT = 60
+
+MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT NOT NULL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    steps: tuple  # requêtes SQL ou coroutines step(cursor)
+
+def add_index(table: str, index: str, columns: str):
+    """
+    Étape ajoutant un index s'il n'existe pas encore (MySQL n'a pas de ADD INDEX IF NOT EXISTS).
+    """
+    async def step(cursor):
+        await cursor.execute("""
+            SELECT 1 FROM information_schema.STATISTICS
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+            LIMIT 1
+        """, (table, index))
+        if await cursor.fetchone() is None:
+            await cursor.execute(f"ALTER TABLE {table} ADD INDEX {index} ({columns})")
+    return step
+
+MIGRATIONS = [
+    Migration(1, "guild_config_tables", (
+        """
+        CREATE TABLE IF NOT EXISTS GameGuilds (
+            server_id BIGINT NOT NULL,
+            game_guild_id INT NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            base_prefix VARCHAR(50) NOT NULL,
+            PRIMARY KEY (server_id, game_guild_id),
+            UNIQUE KEY uq_gameguilds_server_prefix (server_id, base_prefix)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS ServerLanguages (
+            server_id BIGINT NOT NULL,
+            lang_code VARCHAR(16) NOT NULL,
+            lang_name VARCHAR(100) NOT NULL,
+            position INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (server_id, lang_code),
+            KEY idx_serverlanguages_server_position (server_id, position)
+        )
+        """,
+    )),
+    Migration(2, "permission_jobs", (
+        """
+        CREATE TABLE IF NOT EXISTS PermissionJobs (
+            job_id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            guild_id BIGINT NOT NULL,
+            kind VARCHAR(20) NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            params TEXT NULL,
+            total INT NOT NULL DEFAULT 0,
+            done INT NOT NULL DEFAULT 0,
+            changed INT NOT NULL DEFAULT 0,
+            failed INT NOT NULL DEFAULT 0,
+            checkpoint BIGINT NULL,
+            progress_channel_id BIGINT NULL,
+            progress_message_id BIGINT NULL,
+            error TEXT NULL,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            KEY idx_permissionjobs_status (status),
+            KEY idx_permissionjobs_guild_status (guild_id, status)
+        )
+        """,
+    )),
+    # Table créée jusqu'ici à la main, avec category_id pour seule clé :
+    # les lectures par serveur (cache, préchauffage) parcouraient toute la table
+    Migration(3, "category_allocations", (
+        """
+        CREATE TABLE IF NOT EXISTS CategoryAllocations (
+            category_id BIGINT NOT NULL PRIMARY KEY,
+            guild_id BIGINT NOT NULL,
+            category_name VARCHAR(255) NOT NULL,
+            allocated_game_guild_id INT NOT NULL,
+            allocated_game_guild VARCHAR(50) NOT NULL
+        )
+        """,
+        add_index("CategoryAllocations", "idx_categoryallocations_guild_category", "guild_id, category_id"),
+    )),
+    # Table alimentée en dehors du bot, sans schéma déclaré jusqu'ici.
+    # (guild_id, TCgroup_id) sert aussi les requêtes filtrées sur guild_id seul ;
+    # TCgroup_id seul sert la recherche des salons d'un groupe (relais).
+    Migration(4, "text_channel", (
+        """
+        CREATE TABLE IF NOT EXISTS TextChannel (
+            id BIGINT NOT NULL PRIMARY KEY,
+            jump_url VARCHAR(255) NULL,
+            mention VARCHAR(64) NULL,
+            name VARCHAR(255) NULL,
+            type VARCHAR(32) NULL,
+            guild_id BIGINT NULL,
+            Webhook_id BIGINT NULL,
+            short_language VARCHAR(16) NULL,
+            long_language VARCHAR(100) NULL,
+            TCgroup_id BIGINT NULL,
+            Ggroup_id BIGINT NULL
+        )
+        """,
+        add_index("TextChannel", "idx_textchannel_guild_group", "guild_id, TCgroup_id"),
+        add_index("TextChannel", "idx_textchannel_group", "TCgroup_id"),
+    )),
+]
+
+@timed_query
+async def run_migrations(migrations: list = None) -> list:
+    """
+    Applique, dans l'ordre des versions, les migrations non encore enregistrées.
+    Retourne la liste des migrations appliquées par cet appel.
+    """
+    migrations = sorted(migrations or MIGRATIONS, key=lambda migration: migration.version)
+    applied_now = []
+    async with db_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute("SELECT GET_LOCK(%s, %s)", (MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT))
+            (locked,) = await cursor.fetchone()
+            if not locked:
+                raise RuntimeError(f"Verrou {MIGRATION_LOCK} non obtenu après {MIGRATION_LOCK_TIMEOUT}s")
+            try:
+                await cursor.execute(MIGRATIONS_TABLE)
+                await cursor.execute("SELECT version FROM schema_migrations")
+                applied = {row[0] for row in await cursor.fetchall()}
+                for migration in migrations:
+                    if migration.version in applied:
+                        continue
+                    for step in migration.steps:
+                        if callable(step):
+                            await step(cursor)
+                        else:
+                            await cursor.execute(step)
+                    await cursor.execute(
+                        "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                        (migration.version, migration.name)
+                    )
+                    await conn.commit()
+                    logger.info(f"Migration {migration.version} ({migration.name}) appliquée")
+                    applied_now.append(migration)
+            finally:
+                await cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+    return applied_now
+
+async def _main():
+    try:
+        applied = await run_migrations()
+    finally:
+        await close_db_pool()
+    if not applied:
+        print("Schéma à jour, aucune migration appliquée")
+    for migration in applied:
+        print(f"Migration {migration.version} ({migration.name}) appliquée")
+
+if __name__ == "__main__":
+    # python -m Func_SQL.funcSQL_migrations : mise à jour du schéma sans lancer le bot
+    asyncio.run(_main())
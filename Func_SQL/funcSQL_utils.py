@@ -1,10 +1,12 @@
 import aiomysql
 import asyncio
 
-from Func_SQL.db_pool import get_pool
+from Func_Metrics.metrics import timed_query
+from Func_SQL.db_pool import acquire_connection, release_connection, db_connection
 
 # ========================================================================
 # Définition des tables de la base de données
+# (schéma et index : migration 4 de Func_SQL/funcSQL_migrations.py)
 # ========================================================================
 
 TABLES = {
@@ -23,6 +25,12 @@ TABLES = {
     ]
 }
 
+# Colonnes sélectionnées pour un TextChannel (même ordre que TABLES["TextChannels"])
+TEXT_CHANNEL_COLUMNS = ", ".join(TABLES["TextChannels"])
+
+# Nombre maximum d'identifiants par clause IN pour les requêtes groupées
+BULK_CHUNK_SIZE = 500
+
 # ========================================================================
 # Fonctions de connexion à la base de données
 # ========================================================================
@@ -30,28 +38,26 @@ TABLES = {
 async def get_connection() -> aiomysql.Connection:
     """
     Fonction asynchrone pour obtenir une connexion à la base de données.
+    La connexion doit être rendue au pool avec close_connection.
     """
-    pool = await get_pool()
-    return await pool.acquire()
+    return await acquire_connection()
 
 async def close_connection(conn: aiomysql.Connection) -> None:
     """
-    Fonction asynchrone pour fermer une connexion à la base de données.
+    Fonction asynchrone pour rendre une connexion au pool.
     """
-    conn.close()
+    await release_connection(conn)
     
 # ========================================================================
 # Fonctions de requêtes SQL
 # ========================================================================
 
+@timed_query
 async def fetch_text_channel(channel_id: int) -> tuple:
     """
     Fonction asynchrone pour récupérer les informations d'un TextChannel.
     """
-    conn = await get_connection()
-    if conn is None:
-        print("Connexion non établie")
-    try:
+    async with db_connection() as conn:
         async with conn.cursor() as cursor:
             await cursor.execute("""
                 SELECT id, jump_url, mention, name, type, guild_id, Webhook_id, short_language, long_language, TCgroup_id, Ggroup_id
@@ -60,21 +66,78 @@ async def fetch_text_channel(channel_id: int) -> tuple:
             """, (channel_id,))
             result = await cursor.fetchone()
             return result
-    finally:
-        await close_connection(conn)
+
+@timed_query
+async def fetch_text_channels_map(guild_id: int = None, channel_ids: list = None) -> dict:
+    """
+    Fonction asynchrone pour récupérer en une seule requête tous les TextChannel
+    d'un serveur (guild_id) ou d'une liste d'identifiants (channel_ids).
+    Retourne un dictionnaire {id: ligne} avec les mêmes colonnes que fetch_text_channel.
+    """
+    if guild_id is None and channel_ids is None:
+        raise ValueError("guild_id ou channel_ids doit être renseigné")
+    if channel_ids is not None:
+        channel_ids = list(dict.fromkeys(channel_ids))
+        if not channel_ids:
+            return {}
+
+    rows = []
+    async with db_connection() as conn:
+        async with conn.cursor() as cursor:
+            if channel_ids is None:
+                await cursor.execute(f"""
+                    SELECT {TEXT_CHANNEL_COLUMNS}
+                    FROM TextChannel
+                    WHERE guild_id = %s
+                """, (guild_id,))
+                rows.extend(await cursor.fetchall())
+            else:
+                # Découpage en lots pour garder des clauses IN de taille raisonnable
+                for start in range(0, len(channel_ids), BULK_CHUNK_SIZE):
+                    chunk = channel_ids[start:start + BULK_CHUNK_SIZE]
+                    placeholders = ", ".join(["%s"] * len(chunk))
+                    await cursor.execute(f"""
+                        SELECT {TEXT_CHANNEL_COLUMNS}
+                        FROM TextChannel
+                        WHERE id IN ({placeholders})
+                    """, tuple(chunk))
+                    rows.extend(await cursor.fetchall())
+    return {int(row[0]): row for row in rows}
+
+@timed_query
+async def fetch_text_channel_group(channel_id: int, guild_id: int) -> list:
+    """
+    Fonction asynchrone pour récupérer tous les TextChannel du même groupe (TCgroup_id)
+    qu'un salon du serveur guild_id, ce salon compris. Retourne une liste vide si le salon
+    n'existe pas dans ce serveur ou n'appartient à aucun groupe.
+    """
+    async with db_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute("""
+                SELECT TCgroup_id
+                FROM TextChannel
+                WHERE id = %s AND guild_id = %s AND TCgroup_id IS NOT NULL
+            """, (channel_id, guild_id))
+            origin = await cursor.fetchone()
+            if origin is None:
+                return []
+            await cursor.execute(f"""
+                SELECT {TEXT_CHANNEL_COLUMNS}
+                FROM TextChannel
+                WHERE TCgroup_id = %s
+            """, (origin[0],))
+            return list(await cursor.fetchall())
 
 # ========================================================================
 # Fonctions de verifications SQL
 # ========================================================================
 
+@timed_query
 async def check_text_channel(channel_id: int) -> bool:
     """
     Fonction asynchrone pour vérifier si un TextChannel existe.
     """
-    conn = await get_connection()
-    if conn is None:
-        print("Connexion non établie")
-    try:
+    async with db_connection() as conn:
         async with conn.cursor() as cursor:
             await cursor.execute("""
                 SELECT id
@@ -82,6 +145,4 @@ async def check_text_channel(channel_id: int) -> bool:
                 WHERE id = %s
             """, (channel_id,))
             result = await cursor.fetchone()
-            return bool(result)
-    finally:
-        await close_connection(conn)
\ No newline at end of file
+            return bool(result)
\ No newline at end of file
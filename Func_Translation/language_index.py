@@ -0,0 +1,80 @@
+# Func_Translation/language_index.py
+
+import bisect
+import functools
+
+import googletrans
+from discord import app_commands
+
+# ───────────────────────────────────────────────────────────────
+# Index de recherche des langues pour l'autocomplétion
+# ───────────────────────────────────────────────────────────────
+# Construit une seule fois à partir de googletrans.LANGUAGES :
+# - les Choice sont pré-construits ;
+# - les clés (code et nom en minuscules) sont triées pour trouver les
+#   préfixes par dichotomie ;
+# - les résultats sont classés : code exact, puis préfixe, puis sous-chaîne,
+#   et la recherche s'arrête dès que MAX_CHOICES résultats sont trouvés ;
+# - les réponses par saisie sont mises en cache (LRU).
+# ───────────────────────────────────────────────────────────────
+MAX_CHOICES = 25
+
+class LanguageIndex:
+    def __init__(self, languages: dict):
+        entries = sorted((code.lower(), name.lower()) for code, name in languages.items())
+        self.codes = [code for code, _ in entries]
+        self.names = [name for _, name in entries]
+        self.choices = [
+            app_commands.Choice(name=f"{name.title()} ({code.upper()})", value=code.upper())
+            for code, name in entries
+        ]
+        self.position = {code: i for i, code in enumerate(self.codes)}
+        # Clés triées (clé, position) pour la recherche par préfixe
+        self.keys = sorted(
+            [(code, i) for i, code in enumerate(self.codes)] +
+            [(name, i) for i, name in enumerate(self.names)]
+        )
+        self.search = functools.lru_cache(maxsize=1024)(self._search)
+
+    def _prefix_positions(self, current: str):
+        """
+        Positions des langues dont le code ou le nom commence par current, dans l'ordre des clés
+        (parcours par indice depuis la dichotomie, sans copie de la liste).
+        """
+        index = bisect.bisect_left(self.keys, (current,))
+        while index < len(self.keys):
+            key, i = self.keys[index]
+            if not key.startswith(current):
+                break
+            yield i
+            index += 1
+
+    def _search(self, current: str) -> tuple:
+        if not current:
+            return tuple(self.choices[:MAX_CHOICES])
+        seen = set()
+        result = []
+
+        def add(i: int) -> bool:
+            if i not in seen:
+                seen.add(i)
+                result.append(self.choices[i])
+            return len(result) >= MAX_CHOICES
+
+        exact = self.position.get(current)
+        if exact is not None and add(exact):
+            return tuple(result)
+        # Le générateur s'arrête dès MAX_CHOICES résultats (doublons code / nom ignorés par add)
+        for i in self._prefix_positions(current):
+            if add(i):
+                return tuple(result)
+        for i, (code, name) in enumerate(zip(self.codes, self.names)):
+            if i not in seen and (current in code or current in name):
+                if add(i):
+                    break
+        return tuple(result)
+
+    def lookup(self, current: str) -> list:
+        return list(self.search(current.strip().lower()))
+
+language_index = LanguageIndex(googletrans.LANGUAGES)
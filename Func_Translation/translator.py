@@ -0,0 +1,287 @@
+# Func_Translation/translator.py
+
+import os
+import time
+import asyncio
+import hashlib
+import inspect
+import logging
+from collections import OrderedDict
+
+import googletrans
+
+from Func_Metrics.metrics import registry
+
+logger = logging.getLogger("translator")
+
+# ───────────────────────────────────────────────────────────────
+# Traduction des messages relayés
+# ───────────────────────────────────────────────────────────────
+# - backends interchangeables : googletrans (production) ou stub local (tests,
+#   benchmark), choisi par la variable d'environnement translation_backend ;
+# - cache LRU des traductions, clé (empreinte du texte, source, cible) : le
+#   texte lui-même n'est pas gardé en clé, seulement sa traduction ;
+# - requêtes identiques simultanées regroupées sur un seul appel en cours ;
+# - textes courts regroupés par (source, cible) pendant BATCH_WINDOW, puis
+#   traduits en un appel ;
+# - appels au backend bornés (sémaphore) avec délai maximal ; au-delà de
+#   MAX_PENDING traductions en attente, le texte original est renvoyé
+#   immédiatement plutôt que d'allonger la file (pic de messages, raid).
+# ───────────────────────────────────────────────────────────────
+TRANSLATION_CACHE_MAX_SIZE = 10000
+DEFAULT_CONCURRENCY = 8
+DEFAULT_MAX_PENDING = 200
+DEFAULT_TIMEOUT = 10.0
+BATCH_WINDOW = 0.05
+BATCH_MAX_SIZE = 20
+BATCH_MAX_TEXT_LENGTH = 200
+
+TRANSLATIONS = registry.counter(
+    "tikana_translations_total", "Traductions demandées (hit, miss, coalesced, rejected)", ("result",)
+)
+TRANSLATION_ERRORS = registry.counter("tikana_translation_errors_total", "Appels au backend en échec", ("backend", "reason"))
+TRANSLATION_SECONDS = registry.histogram("tikana_translation_backend_seconds", "Durée des appels au backend de traduction", ("mode",))
+TRANSLATION_BATCH_SIZE = registry.histogram(
+    "tikana_translation_batch_size", "Textes par appel groupé", buckets=(1, 2, 5, 10, 20, 50)
+)
+
+class TranslationBackend:
+    name = "base"
+
+    async def translate(self, text: str, src: str, dest: str) -> str:
+        raise NotImplementedError
+
+    async def translate_batch(self, texts: list, src: str, dest: str) -> list:
+        """
+        Traduit plusieurs textes de même source et cible ; par défaut un appel par texte.
+        """
+        return list(await asyncio.gather(*(self.translate(text, src, dest) for text in texts)))
+
+class GoogletransBackend(TranslationBackend):
+    """
+    googletrans >= 3.4 expose une API asynchrone ; les versions 4.0.0rc1 et antérieures
+    sont synchrones et sont alors appelées hors de la boucle asyncio.
+    """
+    name = "googletrans"
+    # Les textes d'un lot sont joints en une seule requête puis redécoupés
+    BATCH_SEPARATOR = "\n§§§\n"
+
+    def __init__(self):
+        self._translator = None
+
+    def _get_translator(self):
+        if self._translator is None:
+            self._translator = googletrans.Translator()
+        return self._translator
+
+    async def translate(self, text: str, src: str, dest: str) -> str:
+        translator = self._get_translator()
+        if inspect.iscoroutinefunction(translator.translate):
+            result = await translator.translate(text, dest=dest, src=src)
+        else:
+            result = await asyncio.to_thread(translator.translate, text, dest=dest, src=src)
+        return result.text
+
+    async def translate_batch(self, texts: list, src: str, dest: str) -> list:
+        joined = await self.translate(self.BATCH_SEPARATOR.join(texts), src, dest)
+        parts = [part.strip() for part in joined.split(self.BATCH_SEPARATOR.strip())]
+        if len(parts) == len(texts):
+            return parts
+        # Séparateur altéré par la traduction : un appel par texte
+        logger.info(f"Lot de {len(texts)} textes non découpable, traduction unitaire")
+        return await super().translate_batch(texts, src, dest)
+
+class StubBackend(TranslationBackend):
+    """
+    Backend local sans réseau : préfixe le texte par la langue cible.
+    """
+    name = "stub"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    async def translate(self, text: str, src: str, dest: str) -> str:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return f"[{dest}] {text}"
+
+    async def translate_batch(self, texts: list, src: str, dest: str) -> list:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [f"[{dest}] {text}" for text in texts]
+
+BACKENDS = {
+    GoogletransBackend.name: GoogletransBackend,
+    StubBackend.name: StubBackend,
+}
+
+def text_digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class Translator:
+    def __init__(self, backend: TranslationBackend, cache_size: int = TRANSLATION_CACHE_MAX_SIZE,
+                 concurrency: int = DEFAULT_CONCURRENCY, max_pending: int = DEFAULT_MAX_PENDING,
+                 timeout: float = DEFAULT_TIMEOUT, batch_window: float = BATCH_WINDOW,
+                 batch_max_size: int = BATCH_MAX_SIZE, batch_max_text_length: int = BATCH_MAX_TEXT_LENGTH):
+        self.backend = backend
+        self.cache_size = cache_size
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.batch_window = batch_window
+        self.batch_max_size = batch_max_size
+        self.batch_max_text_length = batch_max_text_length
+        self._cache = OrderedDict()  # (empreinte, src, dest) -> traduction
+        self._in_flight = {}         # (empreinte, src, dest) -> Future du résultat
+        self._batches = {}           # (src, dest) -> [(texte, Future)]
+        self._batch_timers = {}      # (src, dest) -> TimerHandle
+        self._batch_tasks = set()
+        self._semaphore = None
+        self.pending = 0
+
+    def _normalize(self, lang: str) -> str:
+        return (lang or "auto").lower()
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Créé paresseusement pour être lié à la boucle asyncio du bot
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    def _store(self, key: tuple, translated: str):
+        self._cache[key] = translated
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _call(self, factory, mode: str):
+        """
+        Appel borné au backend : sémaphore partagé puis délai maximal sur l'appel lui-même.
+        """
+        async with self._get_semaphore():
+            start = time.perf_counter()
+            try:
+                return await asyncio.wait_for(factory(), self.timeout)
+            except asyncio.TimeoutError:
+                TRANSLATION_ERRORS.inc(backend=self.backend.name, reason="timeout")
+                raise
+            finally:
+                TRANSLATION_SECONDS.observe(time.perf_counter() - start, mode=mode)
+
+    # ───────────────────────────────────────────────────────────
+    # Regroupement des textes courts
+    # ───────────────────────────────────────────────────────────
+    async def _translate_batched(self, text: str, src: str, dest: str) -> str:
+        loop = asyncio.get_running_loop()
+        batch_key = (src, dest)
+        future = loop.create_future()
+        batch = self._batches.setdefault(batch_key, [])
+        batch.append((text, future))
+        if len(batch) >= self.batch_max_size:
+            self._flush_batch(batch_key)
+        elif len(batch) == 1:
+            self._batch_timers[batch_key] = loop.call_later(self.batch_window, self._flush_batch, batch_key)
+        return await future
+
+    def _flush_batch(self, batch_key: tuple):
+        timer = self._batch_timers.pop(batch_key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._batches.pop(batch_key, None)
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run_batch(batch_key, batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, batch_key: tuple, batch: list):
+        src, dest = batch_key
+        texts = [text for text, _ in batch]
+        try:
+            if len(texts) == 1:
+                results = [await self._call(lambda: self.backend.translate(texts[0], src, dest), "single")]
+            else:
+                results = await self._call(lambda: self.backend.translate_batch(texts, src, dest), "batch")
+            TRANSLATION_BATCH_SIZE.observe(len(texts))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    # ───────────────────────────────────────────────────────────
+    # Point d'entrée
+    # ───────────────────────────────────────────────────────────
+    async def translate(self, text: str, src: str, dest: str) -> str:
+        """
+        Traduit text de src vers dest (codes googletrans, insensibles à la casse).
+        Retourne le texte original si la traduction échoue, expire ou si la file est pleine.
+        """
+        src, dest = self._normalize(src), self._normalize(dest)
+        if not text.strip() or src == dest:
+            return text
+        key = (text_digest(text), src, dest)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            TRANSLATIONS.inc(result="hit")
+            return cached
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            TRANSLATIONS.inc(result="coalesced")
+            return await asyncio.shield(in_flight)
+        if self.pending >= self.max_pending:
+            TRANSLATIONS.inc(result="rejected")
+            return text
+
+        TRANSLATIONS.inc(result="miss")
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self.pending += 1
+        result = text
+        try:
+            if self.batch_window > 0 and len(text) <= self.batch_max_text_length:
+                translated = await self._translate_batched(text, src, dest)
+            else:
+                translated = await self._call(lambda: self.backend.translate(text, src, dest), "single")
+            self._store(key, translated)
+            result = translated
+        except asyncio.TimeoutError:
+            logger.warning(f"Traduction {src} -> {dest} abandonnée après {self.timeout}s")
+        except Exception as e:
+            TRANSLATION_ERRORS.inc(backend=self.backend.name, reason="error")
+            logger.warning(f"Traduction {src} -> {dest} impossible : {e}")
+        finally:
+            self.pending -= 1
+            self._in_flight.pop(key, None)
+            # Les appels regroupés reçoivent le même résultat (le texte original en cas d'échec ou d'annulation)
+            if not future.done():
+                future.set_result(result)
+        return result
+
+    def cache_stats(self) -> dict:
+        return {
+            "size": len(self._cache),
+            "pending": self.pending,
+            "hits": TRANSLATIONS.value(result="hit"),
+            "misses": TRANSLATIONS.value(result="miss"),
+            "coalesced": TRANSLATIONS.value(result="coalesced"),
+            "rejected": TRANSLATIONS.value(result="rejected"),
+        }
+
+def create_backend(name: str = None) -> TranslationBackend:
+    name = name or os.getenv("translation_backend", GoogletransBackend.name)
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        raise ValueError(f"Backend de traduction inconnu : {name} (disponibles : {', '.join(BACKENDS)})")
+    return backend_class()
+
+# Traducteur partagé par le relais de messages
+translator = Translator(create_backend())
+
+registry.gauge("tikana_translation_pending", "Traductions en attente du backend", callback=lambda: translator.pending)
+registry.gauge("tikana_translation_cache_size", "Entrées du cache de traductions", callback=lambda: len(translator._cache))
@@ -0,0 +1,192 @@
+# benchmarks/fake_db.py
+
+import re
+import time
+import asyncio
+import sqlite3
+
+from Func_SQL import db_pool
+
+# ───────────────────────────────────────────────────────────────
+# Pool aiomysql remplacé par une base SQLite en mémoire
+# ───────────────────────────────────────────────────────────────
+# install_fake_pool() remplace Func_SQL.db_pool.get_pool : tout le code Func_SQL
+# (db_connection, acquire_connection, pool_metrics) fonctionne sans MySQL.
+# Les requêtes MySQL sont traduites au minimum (%s, INSERT IGNORE,
+# ON DUPLICATE KEY UPDATE) ; les requêtes DDL de l'application sont ignorées,
+# le schéma équivalent (mêmes index que Func_SQL/funcSQL_migrations.py) est
+# créé ici. Chaque requête peut être retardée pour simuler l'aller-retour
+# réseau vers le serveur MySQL.
+# ───────────────────────────────────────────────────────────────
+
+SCHEMA = """
+CREATE TABLE TextChannel (
+    id INTEGER PRIMARY KEY, jump_url TEXT, mention TEXT, name TEXT, type TEXT, guild_id INTEGER,
+    Webhook_id INTEGER, short_language TEXT, long_language TEXT, TCgroup_id INTEGER, Ggroup_id INTEGER
+);
+CREATE INDEX idx_textchannel_guild_group ON TextChannel (guild_id, TCgroup_id);
+CREATE INDEX idx_textchannel_group ON TextChannel (TCgroup_id);
+CREATE TABLE CategoryAllocations (
+    category_id INTEGER PRIMARY KEY, guild_id INTEGER, category_name TEXT,
+    allocated_game_guild_id INTEGER, allocated_game_guild TEXT
+);
+CREATE INDEX idx_categoryallocations_guild_category ON CategoryAllocations (guild_id, category_id);
+CREATE TABLE GameGuilds (
+    server_id INTEGER, game_guild_id INTEGER, name TEXT, base_prefix TEXT,
+    PRIMARY KEY (server_id, game_guild_id), UNIQUE (server_id, base_prefix)
+);
+CREATE TABLE ServerLanguages (
+    server_id INTEGER, lang_code TEXT, lang_name TEXT, position INTEGER DEFAULT 0,
+    PRIMARY KEY (server_id, lang_code)
+);
+CREATE TABLE PermissionJobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT, guild_id INTEGER, kind TEXT, status TEXT, params TEXT,
+    total INTEGER DEFAULT 0, done INTEGER DEFAULT 0, changed INTEGER DEFAULT 0, failed INTEGER DEFAULT 0,
+    checkpoint INTEGER, progress_channel_id INTEGER, progress_message_id INTEGER, error TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP, updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+_DDL = re.compile(r"^\s*(CREATE|ALTER|DROP)\s", re.IGNORECASE)
+_UPSERT = re.compile(r"\)\s*AS\s+new\s+ON\s+DUPLICATE\s+KEY\s+UPDATE", re.IGNORECASE)
+
+def translate(query: str) -> str:
+    query = query.replace("%s", "?")
+    query = re.sub(r"INSERT\s+IGNORE", "INSERT OR IGNORE", query, flags=re.IGNORECASE)
+    if _UPSERT.search(query):
+        query = _UPSERT.sub(") ON CONFLICT DO UPDATE SET", query).replace("new.", "excluded.")
+    return query
+
+class FakeDatabase:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.sqlite = sqlite3.connect(":memory:")
+        self.sqlite.executescript(SCHEMA)
+        self.queries = 0
+        self.query_time = 0.0
+
+    def reset_counters(self):
+        self.queries = 0
+        self.query_time = 0.0
+
+    async def run(self, query: str, params=(), many: bool = False):
+        self.queries += 1
+        start = time.perf_counter()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if _DDL.match(query):
+            cursor = self.sqlite.execute("SELECT 1 WHERE 0")
+        elif many:
+            cursor = self.sqlite.executemany(translate(query), list(params))
+        else:
+            cursor = self.sqlite.execute(translate(query), tuple(params or ()))
+        self.query_time += time.perf_counter() - start
+        return cursor
+
+    def load(self, guild_id: int, config: dict, text_channels: list = (), allocations: list = ()):
+        """
+        Insère les données d'un serveur synthétique sans les compter comme requêtes du bot.
+        """
+        self.sqlite.executemany("INSERT INTO TextChannel VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", text_channels)
+        self.sqlite.executemany("INSERT INTO CategoryAllocations VALUES (?, ?, ?, ?, ?)", allocations)
+        self.sqlite.executemany("INSERT INTO GameGuilds VALUES (?, ?, ?, ?)", [
+            (guild_id, gg["id"], gg["name"], gg["base_prefix"]) for gg in config["guildes"].values()
+        ])
+        self.sqlite.executemany("INSERT INTO ServerLanguages VALUES (?, ?, ?, ?)", [
+            (guild_id, lang_code, lang_name, position) for position, (lang_code, lang_name) in enumerate(config["languages"].items())
+        ])
+        self.sqlite.commit()
+
+class FakeCursor:
+    def __init__(self, database: FakeDatabase):
+        self.database = database
+        self._rows = []
+        self.lastrowid = None
+        self.rowcount = -1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def _execute(self, query: str, params, many: bool):
+        cursor = await self.database.run(query, params, many)
+        self._rows = cursor.fetchall()
+        self.lastrowid = cursor.lastrowid
+        self.rowcount = cursor.rowcount
+        return self.rowcount
+
+    async def execute(self, query: str, params=None):
+        return await self._execute(query, params, False)
+
+    async def executemany(self, query: str, params):
+        return await self._execute(query, params, True)
+
+    async def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    async def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+class FakeConnection:
+    def __init__(self, database: FakeDatabase):
+        self.database = database
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self.database)
+
+    async def commit(self):
+        self.database.sqlite.commit()
+
+    async def ping(self, reconnect: bool = True):
+        return None
+
+    def close(self):
+        pass
+
+class FakePool:
+    """
+    Interface du pool aiomysql utilisée par db_pool (acquire, release, size, freesize, close).
+    """
+    def __init__(self, database: FakeDatabase, maxsize: int = 100):
+        self.database = database
+        self.maxsize = maxsize
+        self.size = 0
+        self._free = []
+        self._semaphore = asyncio.Semaphore(maxsize)
+
+    @property
+    def freesize(self) -> int:
+        return len(self._free)
+
+    async def acquire(self) -> FakeConnection:
+        await self._semaphore.acquire()
+        if self._free:
+            return self._free.pop()
+        self.size += 1
+        return FakeConnection(self.database)
+
+    async def release(self, conn: FakeConnection):
+        self._free.append(conn)
+        self._semaphore.release()
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+def install_fake_pool(database: FakeDatabase) -> FakePool:
+    """
+    Branche le pool factice sur Func_SQL.db_pool (à appeler dans la boucle asyncio du benchmark).
+    """
+    pool = FakePool(database, db_pool.pool_settings["maxsize"])
+
+    async def get_pool():
+        return pool
+
+    db_pool.pool = pool
+    db_pool.get_pool = get_pool
+    return pool
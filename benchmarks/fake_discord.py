@@ -0,0 +1,234 @@
+# benchmarks/fake_discord.py
+
+import time
+import random
+import asyncio
+from collections import deque
+
+import discord
+
+from Func_Discord.guild_index import guild_index
+
+# ───────────────────────────────────────────────────────────────
+# Serveurs Discord synthétiques et couche REST simulée
+# ───────────────────────────────────────────────────────────────
+# Les rôles et salons héritent des classes discord.py (le code du bot fait
+# des isinstance(..., discord.Role / discord.CategoryChannel)) mais sont
+# construits sans état de connexion. Les écritures (channel.edit,
+# guild.create_role) passent par FakeRest, qui ajoute une latence et applique
+# des limites par route : au-delà, un discord.RateLimited est levé, ce qui
+# exerce le chemin retry / backoff de l'exécuteur partagé.
+# ───────────────────────────────────────────────────────────────
+
+# (requêtes, fenêtre en secondes) par type de route
+DEFAULT_ROUTE_LIMITS = {
+    "channel": (5, 5.0),
+    "guild_roles": (10, 2.0),
+}
+
+class FakeRest:
+    def __init__(self, latency: float = 0.005, jitter: float = 0.5, route_limits: dict = None, global_limit: tuple = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.route_limits = DEFAULT_ROUTE_LIMITS if route_limits is None else route_limits
+        self.global_limit = global_limit  # (requêtes, fenêtre) ou None
+        self._windows = {}
+        self._global_window = deque()
+        self.calls = 0
+        self.rate_limited = 0
+
+    def reset_counters(self):
+        self.calls = 0
+        self.rate_limited = 0
+
+    def _check(self, window: deque, limit: tuple, now: float):
+        count, period = limit
+        while window and window[0] <= now - period:
+            window.popleft()
+        if len(window) >= count:
+            self.rate_limited += 1
+            raise discord.RateLimited(window[0] + period - now)
+
+    async def request(self, route: tuple):
+        self.calls += 1
+        now = time.monotonic()
+        if self.global_limit is not None:
+            self._check(self._global_window, self.global_limit, now)
+        limit = self.route_limits.get(route[0])
+        if limit is not None:
+            window = self._windows.setdefault(route, deque())
+            self._check(window, limit, now)
+            window.append(now)
+        if self.global_limit is not None:
+            self._global_window.append(now)
+        if self.latency:
+            await asyncio.sleep(self.latency * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+class FakeRole(discord.Role):
+    def __init__(self, guild: "FakeGuild", role_id: int, name: str, position: int = 0):
+        self.guild = guild
+        self.id = role_id
+        self.name = name
+        self.position = position
+
+    def __repr__(self) -> str:
+        return f"<FakeRole id={self.id} name={self.name!r}>"
+
+class _FakeChannelMixin:
+    def _init_fake(self, guild: "FakeGuild", channel_id: int, name: str, category_id: int = None, position: int = 0):
+        self.guild = guild
+        self.id = channel_id
+        self.name = name
+        self.category_id = category_id
+        self.position = position
+        self._fake_overwrites = {}
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} id={self.id} name={self.name!r}>"
+
+    @property
+    def overwrites(self) -> dict:
+        return dict(self._fake_overwrites)
+
+    @property
+    def category(self):
+        return self.guild.get_channel(self.category_id) if self.category_id else None
+
+    async def edit(self, *, overwrites: dict = None, **kwargs):
+        await self.guild.rest.request(("channel", self.id))
+        if overwrites is not None:
+            self._fake_overwrites = dict(overwrites)
+        return self
+
+class FakeCategory(_FakeChannelMixin, discord.CategoryChannel):
+    def __init__(self, guild: "FakeGuild", channel_id: int, name: str, position: int = 0):
+        self._init_fake(guild, channel_id, name, None, position)
+
+class FakeTextChannel(_FakeChannelMixin, discord.TextChannel):
+    def __init__(self, guild: "FakeGuild", channel_id: int, name: str, category_id: int = None, position: int = 0):
+        self._init_fake(guild, channel_id, name, category_id, position)
+
+class FakeGuild:
+    def __init__(self, guild_id: int, rest: FakeRest, name: str = "Bench"):
+        self.id = guild_id
+        self.name = name
+        self.rest = rest
+        self._next_id = guild_id + 1
+        self.default_role = FakeRole(self, guild_id, "@everyone")
+        self.roles = [self.default_role]
+        self.channels = []
+        self._roles_by_id = {guild_id: self.default_role}
+        self._channels_by_id = {}
+
+    def next_id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    @property
+    def categories(self) -> list:
+        return [channel for channel in self.channels if isinstance(channel, discord.CategoryChannel)]
+
+    @property
+    def text_channels(self) -> list:
+        return [channel for channel in self.channels if isinstance(channel, discord.TextChannel)]
+
+    def get_role(self, role_id: int):
+        return self._roles_by_id.get(role_id)
+
+    def get_member(self, member_id: int):
+        return None
+
+    def get_channel(self, channel_id: int):
+        return self._channels_by_id.get(channel_id)
+
+    def add_role(self, name: str) -> FakeRole:
+        role = FakeRole(self, self.next_id(), name, len(self.roles))
+        self.roles.append(role)
+        self._roles_by_id[role.id] = role
+        return role
+
+    def add_channel(self, channel):
+        self.channels.append(channel)
+        self._channels_by_id[channel.id] = channel
+        return channel
+
+    async def create_role(self, *, name: str, **kwargs) -> FakeRole:
+        """
+        Comme discord.py : le rôle retourné n'est ajouté à guild.roles qu'à la réception de
+        l'événement GUILD_ROLE_CREATE, simulé ici après la latence de l'API.
+        """
+        await self.rest.request(("guild_roles", self.id))
+        role = FakeRole(self, self.next_id(), name, len(self.roles))
+        asyncio.get_running_loop().call_later(self.rest.latency, self._gateway_role_create, role)
+        return role
+
+    def _gateway_role_create(self, role: FakeRole):
+        # Ce que fait le bot sur on_guild_role_create (Bot_main)
+        self.roles.append(role)
+        self._roles_by_id[role.id] = role
+        guild_index.on_role_create(role)
+
+class FakeBot:
+    """
+    Ce que JobManager attend du bot : get_guild, get_channel et guilds.
+    """
+    def __init__(self, guilds: list):
+        self.guilds = guilds
+        self._guilds_by_id = {guild.id: guild for guild in guilds}
+
+    def get_guild(self, guild_id: int):
+        return self._guilds_by_id.get(guild_id)
+
+    def get_channel(self, channel_id: int):
+        return None
+
+# ───────────────────────────────────────────────────────────────
+# Construction d'un serveur synthétique
+# ───────────────────────────────────────────────────────────────
+def build_guild(rest: FakeRest, guild_id: int, channels: int, categories: int, game_guilds: int, languages: list,
+                provision_roles: bool = False, seed: int = 0) -> tuple:
+    """
+    Construit un serveur et les données BDD associées. Retourne (guild, config, text_channel_rows, allocations).
+    - un tiers des salons porte le préfixe complet "<prefix>_<lang>" ;
+    - la moitié des catégories porte un préfixe, l'autre moitié est allouée en BDD ;
+    - les autres salons passent par l'allocation de leur catégorie ou le fallback.
+    """
+    rng = random.Random(seed)
+    guild = FakeGuild(guild_id, rest)
+    prefixes = [f"G{index:02d}" for index in range(1, game_guilds + 1)]
+    config = {
+        "guildes": {
+            str(index): {"id": index, "name": f"Guilde {index}", "base_prefix": prefix}
+            for index, prefix in enumerate(prefixes, start=1)
+        },
+        "languages": {lang: lang for lang in languages},
+    }
+    if provision_roles:
+        for prefix in prefixes:
+            for lang in languages:
+                guild.add_role(f"Role_{prefix}_{lang}")
+
+    allocations = []
+    category_objects = []
+    for index in range(categories):
+        prefix = prefixes[index % len(prefixes)]
+        if index % 2 == 0:
+            category = FakeCategory(guild, guild.next_id(), f"{prefix} Zone {index}", index)
+        else:
+            category = FakeCategory(guild, guild.next_id(), f"Zone {index}", index)
+            game_guild_id = index % len(prefixes) + 1
+            allocations.append((category.id, guild_id, category.name, game_guild_id, prefix))
+        category_objects.append(guild.add_channel(category))
+
+    rows = []
+    for index in range(channels):
+        lang = languages[index % len(languages)]
+        prefix = rng.choice(prefixes)
+        category = category_objects[index % len(category_objects)] if category_objects else None
+        name = f"{prefix}_{lang.lower()}-salon-{index}" if index % 3 == 0 else f"salon-{index}-{lang.lower()}"
+        channel = guild.add_channel(FakeTextChannel(guild, guild.next_id(), name, category.id if category else None, index))
+        rows.append((
+            channel.id, f"https://discord.com/channels/{guild_id}/{channel.id}", f"<#{channel.id}>", name, "text",
+            guild_id, None, lang, lang, index // max(1, len(languages)), None
+        ))
+    return guild, config, rows, allocations
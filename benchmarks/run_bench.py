@@ -0,0 +1,131 @@
+# benchmarks/run_bench.py
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Func_Config import server_config
+from Func_SQL.funcSQL_jobs import fetch_job
+from Func_SQL.funcSQL_guilds import load_guild_config
+from Func_Discord.api_executor import executor
+from Func_Discord.perm_jobs import JobManager, JOB_SYNC, JOB_ROLLBACK
+from Func_Translation.language_index import language_index
+from benchmarks.fake_db import FakeDatabase, install_fake_pool
+from benchmarks.fake_discord import FakeRest, FakeBot, build_guild
+
+# ───────────────────────────────────────────────────────────────
+# Benchmark hors ligne de /sync_channels, /rollback et des autocomplétions
+# ───────────────────────────────────────────────────────────────
+# python -m benchmarks.run_bench [--sizes 100,1000,10000] [--api-latency 0.005] ...
+#
+# Pour chaque taille de serveur synthétique :
+# - sync_initial  : premier /sync_channels (rôles à créer, tous les salons à modifier) ;
+# - sync_noop     : second passage, serveur déjà conforme (coût du plan seul) ;
+# - rollback      : retour au backup pris avant le premier passage ;
+# - autocomplete  : recherches de langues et lectures de config en cache.
+# Les jobs passent par le vrai JobManager, le vrai exécuteur et le vrai code
+# Func_SQL ; seuls Discord (FakeRest) et MySQL (SQLite en mémoire) sont simulés.
+# ───────────────────────────────────────────────────────────────
+DEFAULT_SIZES = "100,1000,10000"
+DEFAULT_LANGUAGES = "FR,EN,DE,ES,IT"
+AUTOCOMPLETE_INPUTS = ["", "f", "fr", "fre", "en", "ger", "span", "ital", "zh", "xyz"]
+
+def _row(scenario: str, size: int, wall: float, database: FakeDatabase, rest: FakeRest, extra: str = "") -> dict:
+    return {
+        "scenario": scenario,
+        "channels": size,
+        "wall_s": round(wall, 3),
+        "db_queries": database.queries,
+        "db_time_s": round(database.query_time, 3),
+        "api_calls": rest.calls,
+        "api_429": rest.rate_limited,
+        "details": extra,
+    }
+
+async def _measure(scenario: str, size: int, database: FakeDatabase, rest: FakeRest, coro) -> dict:
+    database.reset_counters()
+    rest.reset_counters()
+    start = time.perf_counter()
+    extra = await coro
+    return _row(scenario, size, time.perf_counter() - start, database, rest, extra or "")
+
+async def _run_job(manager: JobManager, kind: str, guild, params: dict = None) -> str:
+    job_id, _ = await manager.submit(kind, guild, params)
+    await manager.wait(job_id)
+    job = await fetch_job(job_id)
+    return f"job #{job_id} {job['status']} : {job['changed']} modifiés / {job['total']}, {job['failed']} en échec"
+
+async def _autocomplete(guild_id: int, rounds: int) -> str:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for current in AUTOCOMPLETE_INPUTS:
+            language_index.lookup(current)
+            await load_guild_config(guild_id, readonly=True)
+    calls = rounds * len(AUTOCOMPLETE_INPUTS)
+    return f"{calls} appels, {(time.perf_counter() - start) / calls * 1e6:.1f} µs/appel"
+
+async def bench_size(args, size: int, guild_id: int, database: FakeDatabase) -> list:
+    rest = FakeRest(latency=args.api_latency, global_limit=(args.global_rate, 1.0) if args.global_rate else None)
+    languages = args.languages.split(",")
+    categories = max(1, size // args.channels_per_category)
+    guild, config, rows, allocations = build_guild(rest, guild_id, size, categories, args.game_guilds, languages, seed=size)
+    database.load(guild_id, config, rows, allocations)
+
+    manager = JobManager()
+    manager.attach(FakeBot([guild]))
+    results = []
+    results.append(await _measure("sync_initial", size, database, rest, _run_job(manager, JOB_SYNC, guild)))
+    results.append(await _measure("sync_noop", size, database, rest, _run_job(manager, JOB_SYNC, guild)))
+    # Le premier job a pris le backup v1 avant toute modification
+    results.append(await _measure("rollback", size, database, rest, _run_job(manager, JOB_ROLLBACK, guild, {"version": 1})))
+    results.append(await _measure("autocomplete", size, database, rest, _autocomplete(guild_id, args.autocomplete_rounds)))
+    return results
+
+def print_table(results: list):
+    headers = ["scenario", "channels", "wall_s", "db_queries", "db_time_s", "api_calls", "api_429", "details"]
+    widths = {header: max(len(header), *(len(str(row[header])) for row in results)) for header in headers}
+    print("  ".join(header.ljust(widths[header]) for header in headers))
+    print("  ".join("-" * widths[header] for header in headers))
+    for row in results:
+        print("  ".join(str(row[header]).ljust(widths[header]) for header in headers))
+
+async def main(args):
+    database = FakeDatabase(latency=args.db_latency)
+    install_fake_pool(database)
+    executor.concurrency = args.concurrency
+    results = []
+    for index, size in enumerate(int(value) for value in args.sizes.split(",")):
+        guild_id = (index + 1) * 10 ** 9
+        results.extend(await bench_size(args, size, guild_id, database))
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark hors ligne des commandes de permissions")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Nombres de salons, séparés par des virgules")
+    parser.add_argument("--languages", default=DEFAULT_LANGUAGES, help="Codes de langue du serveur")
+    parser.add_argument("--game-guilds", type=int, default=3, help="Nombre de guildes de jeu")
+    parser.add_argument("--channels-per-category", type=int, default=50)
+    parser.add_argument("--api-latency", type=float, default=0.005, help="Latence simulée d'un appel Discord (s)")
+    parser.add_argument("--global-rate", type=int, default=0, help="Limite globale d'appels Discord par seconde (0 = aucune)")
+    parser.add_argument("--db-latency", type=float, default=0.0005, help="Latence simulée d'une requête SQL (s)")
+    parser.add_argument("--concurrency", type=int, default=executor.concurrency, help="Concurrence de l'exécuteur d'écritures")
+    parser.add_argument("--autocomplete-rounds", type=int, default=200)
+    parser.add_argument("--json", default=None, help="Fichier de sortie JSON (optionnel)")
+    parser.add_argument("--verbose", action="store_true", help="Affiche les logs (429, étapes...)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR)
+    # Les snapshots du benchmark sont écrits dans un dossier temporaire
+    with tempfile.TemporaryDirectory(prefix="tikana_bench_") as folder:
+        server_config.BASE_DIR = folder
+        asyncio.run(main(args))
@@ -56,4 +56,50 @@ def load_db_config(path: str = db_file) -> dict[str, Any]:
     Fonction synchrone pour charger les paramètres de connexion BDD depuis un fichier JSON.
     """
     with open(path, 'r', encoding='utf-8') as file:
-        return json.load(file)
\ No newline at end of file
+        return json.load(file)
+
+# ========================================================================
+# Sharding (optionnel)
+# ========================================================================
+# shard_count : nombre total de shards (vide = nombre recommandé par Discord)
+# shard_ids   : shards gérés par ce processus, ex. "0,1" ou "0-3" (vide = tous)
+# Ces variables peuvent venir de token.env ou être fixées par launcher.py.
+
+def parse_shard_ids(value: str) -> Union[list[int], None]:
+    """
+    Convertit "0,2,5-7" en [0, 2, 5, 6, 7] ; retourne None si la valeur est vide.
+    """
+    if not value:
+        return None
+    shard_ids = []
+    for part in value.split(","):
+        part = part.strip()
+        if "-" in part:
+            start, end = part.split("-", 1)
+            shard_ids.extend(range(int(start), int(end) + 1))
+        elif part:
+            shard_ids.append(int(part))
+    return shard_ids
+
+SHARD_COUNT = int(os.getenv("shard_count")) if os.getenv("shard_count") else None
+SHARD_IDS = parse_shard_ids(os.getenv("shard_ids", ""))
+
+# ========================================================================
+# Métriques (optionnel)
+# ========================================================================
+# metrics_port : port de l'endpoint /metrics (vide = désactivé)
+# metrics_host : interface d'écoute (127.0.0.1 par défaut)
+# Avec launcher.py, chaque processus écoute sur metrics_port + bot_process_index.
+
+METRICS_PORT = int(os.getenv("metrics_port")) + int(os.getenv("bot_process_index", "0")) if os.getenv("metrics_port") else None
+METRICS_HOST = os.getenv("metrics_host", "127.0.0.1")
+
+# ========================================================================
+# Synchronisation des commandes
+# ========================================================================
+# dev_guild_ids      : serveurs de développement, ex. "123,456" ; les commandes y sont
+#                      synchronisées immédiatement, sans sync global
+# force_command_sync : "1" pour synchroniser même si l'arbre de commandes n'a pas changé
+
+DEV_GUILD_IDS = [int(value) for value in os.getenv("dev_guild_ids", "").split(",") if value.strip()]
+FORCE_COMMAND_SYNC = os.getenv("force_command_sync", "0").lower() in ("1", "true", "yes")
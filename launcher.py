@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import signal
+import argparse
+import subprocess
+
+# ========================================================================
+# Lanceur multi-processus : chaque processus gère une plage de shards
+# ========================================================================
+# Exemple : python launcher.py --processes 4 --shards 16
+#   processus 0 -> shards 0-3, processus 1 -> shards 4-7, ...
+# Chaque processus exécute Bot_main.py avec les variables d'environnement
+# shard_count / shard_ids / bot_process_count / bot_process_index. Un processus qui s'arrête
+# anormalement est relancé après un délai.
+# ========================================================================
+
+RESTART_DELAY = 5.0
+
+def shard_ranges(shard_count: int, processes: int) -> list[str]:
+    """
+    Répartit shard_count shards en plages contiguës ("0-3", "4-7", ...) sur processes processus.
+    """
+    ranges = []
+    base, extra = divmod(shard_count, processes)
+    start = 0
+    for index in range(processes):
+        size = base + (1 if index < extra else 0)
+        if size:
+            ranges.append(f"{start}-{start + size - 1}")
+        start += size
+    return ranges
+
+def spawn(shard_count: int, shard_ids: str, process_count: int, index: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    env["shard_count"] = str(shard_count)
+    env["shard_ids"] = shard_ids
+    env["bot_process_count"] = str(process_count)
+    env["bot_process_index"] = str(index)
+    print(f"Démarrage du processus pour les shards {shard_ids}/{shard_count}")
+    return subprocess.Popen([sys.executable, "Bot_main.py"], env=env)
+
+def main():
+    parser = argparse.ArgumentParser(description="Lance le bot en plusieurs processus shardés")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Nombre de processus")
+    parser.add_argument("--shards", type=int, default=None, help="Nombre total de shards (défaut : un par processus)")
+    args = parser.parse_args()
+
+    shard_count = args.shards or args.processes
+    ranges = shard_ranges(shard_count, min(args.processes, shard_count))
+    indexes = {shard_ids: index for index, shard_ids in enumerate(ranges)}
+    children = {shard_ids: spawn(shard_count, shard_ids, len(ranges), indexes[shard_ids]) for shard_ids in ranges}
+
+    def stop(*_):
+        for child in children.values():
+            child.terminate()
+        for child in children.values():
+            child.wait()
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while any(child.poll() is None or child.returncode != 0 for child in children.values()):
+        time.sleep(1)
+        for shard_ids, child in list(children.items()):
+            code = child.poll()
+            if code is not None and code != 0:
+                print(f"Processus des shards {shard_ids} arrêté (code {code}), relance dans {RESTART_DELAY}s")
+                time.sleep(RESTART_DELAY)
+                children[shard_ids] = spawn(shard_count, shard_ids, len(ranges), indexes[shard_ids])
+
+if __name__ == "__main__":
+    main()